@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import DiagnosticExchangeCode
+from .models import DiagnosticExchangeCode, TokenGeneration
 
 admin.site.register(DiagnosticExchangeCode)
+admin.site.register(TokenGeneration)
@@ -0,0 +1,108 @@
+"""
+Diagnostic-session analytics over ``DiagnosticExchangeCode``.
+
+Every diagnostic login creates one exchange code, so the codes double as a
+session log: ``used``/``redeemed_at`` say whether and when the customer tab
+was opened, and a code left unused past ``DIAGNOSTIC_CODE_EXPIRY`` expired.
+``session_stats`` computes the per-staff aggregates in grouped queries (the
+``(staff_user, used, created_at)`` index covers the grouping and filters);
+``session_rows`` streams the raw codes with ``.iterator()``.  Neither loads
+the table into memory.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import DiagnosticExchangeCode
+
+STAT_FIELDS = ('started', 'redeemed', 'expired_unused', 'pending', 'avg_seconds_to_redeem')
+
+
+def _codes(since=None, until=None, staff_user_id=None):
+    codes = DiagnosticExchangeCode.objects.all()
+    if since is not None:
+        codes = codes.filter(created_at__gte=since)
+    if until is not None:
+        codes = codes.filter(created_at__lt=until)
+    if staff_user_id is not None:
+        codes = codes.filter(staff_user_id=staff_user_id)
+    return codes
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.DIAGNOSTIC_CODE_EXPIRY)
+
+
+def _aggregates(cutoff):
+    return {
+        'started': Count('pk'),
+        'redeemed': Count('pk', filter=Q(used=True)),
+        'expired_unused': Count('pk', filter=Q(used=False, created_at__lt=cutoff)),
+        # Codes redeemed before redeemed_at was recorded have no time to redeem.
+        'avg_time_to_redeem': Avg(
+            ExpressionWrapper(F('redeemed_at') - F('created_at'), output_field=DurationField()),
+            filter=Q(redeemed_at__isnull=False),
+        ),
+    }
+
+
+def _finish(stats):
+    stats['pending'] = stats['started'] - stats['redeemed'] - stats['expired_unused']
+    avg = stats['avg_time_to_redeem']
+    stats['avg_seconds_to_redeem'] = round(avg.total_seconds(), 3) if avg is not None else None
+    return {field: stats[field] for field in STAT_FIELDS}
+
+
+def session_stats(since=None, until=None, staff_user_id=None):
+    """Return ``{'staff': [...], 'totals': {...}}`` for codes created in ``[since, until)``.
+
+    Each staff entry has ``staff_user_id``, ``staff_username`` and the
+    ``STAT_FIELDS``: sessions started, redeemed, expired unused, still
+    pending, and the average seconds from diagnostic login to redemption.
+    """
+    codes = _codes(since, until, staff_user_id)
+    aggregates = _aggregates(_expiry_cutoff())
+    rows = (
+        codes.values('staff_user_id', 'staff_user__username')
+        .annotate(**aggregates)
+        .order_by('staff_user__username')
+    )
+    staff = [
+        {'staff_user_id': row['staff_user_id'], 'staff_username': row['staff_user__username'], **_finish(row)}
+        for row in rows
+    ]
+    return {'staff': staff, 'totals': _finish(codes.aggregate(**aggregates))}
+
+
+def session_rows(since=None, until=None, staff_user_id=None, chunk_size=2000):
+    """Yield one dict per exchange code, oldest first, streaming from the database."""
+    cutoff = _expiry_cutoff()
+    rows = (
+        _codes(since, until, staff_user_id)
+        .order_by('created_at', 'pk')
+        .values_list(
+            'code', 'staff_user_id', 'staff_user__username', 'customer_user_id',
+            'customer_user__username', 'created_at', 'used', 'redeemed_at',
+        )
+    )
+    for row in rows.iterator(chunk_size):
+        code, staff_id, staff_name, customer_id, customer_name, created_at, used, redeemed_at = row
+        if used:
+            state = 'redeemed'
+        elif created_at < cutoff:
+            state = 'expired'
+        else:
+            state = 'pending'
+        yield {
+            'code': str(code),
+            'staff_user_id': staff_id,
+            'staff_username': staff_name,
+            'customer_user_id': customer_id,
+            'customer_username': customer_name,
+            'created_at': created_at.isoformat(),
+            'status': state,
+            'redeemed_at': redeemed_at.isoformat() if redeemed_at else None,
+            'seconds_to_redeem': round((redeemed_at - created_at).total_seconds(), 3) if redeemed_at else None,
+        }
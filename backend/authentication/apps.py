@@ -0,0 +1,23 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class AuthenticationConfig(AppConfig):
+    name = 'authentication'
+
+    def ready(self):
+        if settings.AUTH_EVENT_LOG:
+            from . import events
+            events.start(settings.AUTH_EVENT_LOG, settings.AUTH_EVENT_QUEUE_SIZE)
+
+        if settings.JWT_FAST_CODEC:
+            from .codec import install_fast_codec
+            install_fast_codec()
+
+        if settings.USER_SEARCH_INDEX:
+            from django.contrib.auth.models import User
+            from django.db.models.signals import post_delete, post_save
+            from .search import reindex_user, unindex_user
+
+            post_save.connect(reindex_user, sender=User, dispatch_uid='authentication.search.reindex_user')
+            post_delete.connect(unindex_user, sender=User, dispatch_uid='authentication.search.unindex_user')
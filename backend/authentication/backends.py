@@ -1,15 +1,65 @@
 """
 Custom JWT authentication backend that reads tokens from HTTP-only cookies.
 """
+import copy
+from functools import partial
+
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+
+from .utils import get_token_generations, token_generation_is_current
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    ``request.user`` that only loads the user row when it has to.
+
+    ``pk``/``id`` come from the token's user-ID claim and the authentication
+    flags are constant, so views and permissions that need nothing else run
+    no user query.  Any other attribute loads the user through
+    ``JWTAuthentication.get_user``, which raises ``AuthenticationFailed`` at
+    that point for deleted or inactive users.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, func, user_id):
+        super().__init__(func)
+        # LazyObject.__setattr__ would load the user; write the dict directly.
+        self.__dict__['_user_id'] = user_id
+
+    @property
+    def pk(self):
+        return self._user_id
+
+    id = pk
+
+    def __bool__(self):
+        return True
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            return type(self)(self._setupfunc, self._user_id)
+        return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            result = type(self)(self._setupfunc, self._user_id)
+            memo[id(self)] = result
+            return result
+        return copy.deepcopy(self._wrapped, memo)
 
 
 class CookieJWTAuthentication(JWTAuthentication):
     """
     Reads the JWT access token from an HTTP-only cookie instead of the
-    Authorization header.
+    Authorization header.  Tokens from an older token generation (see
+    ``TokenGeneration``) are treated as absent.  The user is returned as a
+    ``LazyUser``, loaded on first use of anything but its primary key.
     """
 
     def authenticate(self, request):
@@ -22,4 +72,90 @@ class CookieJWTAuthentication(JWTAuthentication):
         except TokenError:
             return None
 
-        return self.get_user(validated_token), validated_token
+        if not token_generation_is_current(validated_token):
+            return None
+
+        return self.get_lazy_user(validated_token), validated_token
+
+    def get_lazy_user(self, validated_token):
+        """Wrap ``get_user`` in a ``LazyUser`` when the user-ID claim is the primary key."""
+        if api_settings.USER_ID_FIELD != self.user_model._meta.pk.name:
+            return self.get_user(validated_token)
+        return LazyUser(
+            partial(self.get_user, validated_token),
+            validated_token[api_settings.USER_ID_CLAIM],
+        )
+
+    def introspect(self, raw_tokens):
+        """
+        Validate many access tokens the way ``authenticate`` would.
+
+        Returns one dict per token, in order.  Inactive tokens are reported as
+        ``{'active': False}``; active ones also carry ``user_id``, ``exp`` and
+        ``is_staff``.  Users are looked up in a single query for the whole
+        batch instead of once per token, as are token generations on a
+        cache miss.
+        """
+        validated = []
+        for raw_token in raw_tokens:
+            try:
+                token = self.get_validated_token(raw_token)
+            except (TokenError, InvalidToken):
+                token = None
+            if token is not None and api_settings.USER_ID_CLAIM not in token:
+                token = None
+            validated.append(token)
+
+        candidates = {token[api_settings.USER_ID_CLAIM] for token in validated if token is not None}
+        generations = get_token_generations(candidates) if candidates else {}
+        validated = [
+            token if token is not None and token_generation_is_current(token, generations) else None
+            for token in validated
+        ]
+
+        user_ids = {token[api_settings.USER_ID_CLAIM] for token in validated if token is not None}
+        users = {}
+        if user_ids:
+            field = api_settings.USER_ID_FIELD
+            users = dict(
+                self.user_model.objects.filter(
+                    **{f'{field}__in': user_ids, 'is_active': True}
+                ).values_list(field, 'is_staff')
+            )
+
+        results = []
+        for token in validated:
+            user_id = token[api_settings.USER_ID_CLAIM] if token is not None else None
+            if user_id not in users:
+                results.append({'active': False})
+                continue
+            results.append({
+                'active': True,
+                'user_id': user_id,
+                'exp': token['exp'],
+                'is_staff': users[user_id],
+            })
+        return results
+
+
+class BearerJWTAuthentication(CookieJWTAuthentication):
+    """
+    Reads the access token from the ``Authorization: Bearer`` header, for
+    the gateway and service accounts.  Applies the same token-generation
+    check as the cookie backend, so "log out everywhere" revokes header
+    tokens too; a revoked token is rejected rather than ignored.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if not token_generation_is_current(validated_token):
+            raise InvalidToken({'detail': 'Token has been revoked.', 'code': 'token_revoked'})
+
+        return self.get_lazy_user(validated_token), validated_token
@@ -0,0 +1,382 @@
+"""
+Micro-benchmarks comparing the stock code paths against the optimised ones.
+
+Each suite returns rows of ``(case, baseline, candidate, unit)`` where lower
+is better; the ``benchmark`` management command prints them as a table.
+The ``DATABASE_SUITES`` create rows, so the command only runs them on
+request, inside ``throwaway_database``.
+"""
+import io
+import os
+import random
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.test.utils import override_settings
+from django.http.cookie import parse_cookie
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken, Token
+
+from . import renderers, search
+from .codec import build_token_backend
+from .renderers import FastJSONParser, FastJSONRenderer
+from .serializers import USER_FIELDS, UserSerializer, user_values
+from .tokens import CompactAccessToken, CompactRefreshToken
+
+
+@contextmanager
+def throwaway_database():
+    """Point the default connection at a freshly migrated test database.
+
+    The test database is created the way the test runner creates it (in
+    memory on SQLite) and destroyed on exit, so the configured database is
+    never written to or locked.
+    """
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def _per_op(func, iterations):
+    """Return the mean wall-clock seconds per call of ``func``."""
+    func()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations
+
+
+def _with_backend(backend, func):
+    """Run ``func`` with ``backend`` installed as the simplejwt token backend."""
+    previous = Token._token_backend
+    Token._token_backend = backend
+    try:
+        return func()
+    finally:
+        Token._token_backend = previous
+
+
+def bench_codec(iterations=20000):
+    """PyJWT (stock ``TokenBackend``) versus ``FastTokenBackend``."""
+    stock = build_token_backend(fast=False)
+    fast = build_token_backend(fast=True)
+
+    payload = RefreshToken().access_token.payload
+    payload['user_id'] = 1
+    raw = stock.encode(payload)
+
+    rows = [
+        ('backend encode', _per_op(lambda: stock.encode(payload), iterations),
+         _per_op(lambda: fast.encode(payload), iterations), 's/op'),
+        ('backend decode', _per_op(lambda: stock.decode(raw), iterations),
+         _per_op(lambda: fast.decode(raw), iterations), 's/op'),
+    ]
+
+    def verify_access():
+        return AccessToken(raw)
+
+    def mint_pair():
+        refresh = RefreshToken()
+        refresh['user_id'] = 1
+        return str(refresh), str(refresh.access_token)
+
+    for case, func in (('AccessToken verify', verify_access), ('mint token pair', mint_pair)):
+        rows.append((
+            case,
+            _with_backend(stock, lambda: _per_op(func, iterations)),
+            _with_backend(fast, lambda: _per_op(func, iterations)),
+            's/op',
+        ))
+    return rows
+
+
+class _StockUserSerializer(serializers.ModelSerializer):
+    """``UserSerializer`` without the direct-attribute fast path."""
+
+    class Meta:
+        model = User
+        fields = USER_FIELDS
+
+
+def bench_json(iterations=20, users=5000):
+    """Stock serializer, renderer and parser versus the fast ones on a user list.
+
+    Uses ``users`` unsaved ``User`` instances, the shape ``UserListView``
+    returns.  The renderer and parser rows name the encoder the fast classes
+    use; without orjson installed they compare the stock classes with
+    themselves.
+    """
+    engine = 'orjson' if renderers.orjson is not None else 'json'
+
+    instances = [
+        User(id=i, username=f'customer{i}', email=f'customer{i}@example.com',
+             first_name='Zoë', last_name=f'Customer {i}')
+        for i in range(1, users + 1)
+    ]
+    data = UserSerializer(instances, many=True).data
+    stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+    body = stock_renderer.render(data)
+    stock_parser, fast_parser = JSONParser(), FastJSONParser()
+
+    def user_list(serializer_class, renderer):
+        return renderer.render(serializer_class(instances, many=True).data)
+
+    cases = (
+        (f'serialize {users} users',
+         lambda: _StockUserSerializer(instances, many=True).data,
+         lambda: UserSerializer(instances, many=True).data),
+        (f'render {users} users ({engine})',
+         lambda: stock_renderer.render(data),
+         lambda: fast_renderer.render(data)),
+        (f'parse {users} users ({engine})',
+         lambda: stock_parser.parse(io.BytesIO(body)),
+         lambda: fast_parser.parse(io.BytesIO(body))),
+        ('user list end to end',
+         lambda: user_list(_StockUserSerializer, stock_renderer),
+         lambda: user_list(UserSerializer, fast_renderer)),
+    )
+    return [
+        (case, _per_op(baseline, iterations), _per_op(candidate, iterations), 's/op')
+        for case, baseline, candidate in cases
+    ]
+
+
+def _peak_bytes(func):
+    """Return the peak traced allocation, in bytes, while ``func`` runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_serialization(iterations=10, users=5000):
+    """Model instances + ``UserSerializer`` versus ``user_values`` for the customer list.
+
+    Creates ``users`` customers in a transaction that is rolled back, and
+    times the ``UserListView`` query plus serialization both ways.
+    """
+    with transaction.atomic():
+        User.objects.bulk_create(
+            User(username=f'bench-customer-{i}', email=f'bench-customer-{i}@example.com',
+                 first_name='Bench', last_name=f'Customer {i}', password='!')
+            for i in range(users)
+        )
+        customers = User.objects.filter(is_staff=False, is_active=True).order_by('username')
+
+        def instances():
+            return UserSerializer(customers.all(), many=True).data
+
+        def values():
+            return list(user_values(customers.all()))
+
+        rows = [
+            (f'list {users} users', _per_op(instances, iterations), _per_op(values, iterations), 's/op'),
+            (f'list {users} users (peak)', _peak_bytes(instances), _peak_bytes(values), 'bytes'),
+        ]
+        transaction.set_rollback(True)
+    return rows
+
+
+def _session_cookies(access_class, refresh_class, user, staff):
+    """Return the ``Cookie`` header values of a regular and a diagnostic session."""
+    refresh = refresh_class.for_user(user)
+    refresh[settings.TOKEN_GENERATION_CLAIM] = 0
+    staff_access = access_class.for_user(staff)
+    staff_access[settings.TOKEN_GENERATION_CLAIM] = 0
+    session = (
+        f'{settings.ACCESS_TOKEN_COOKIE}={refresh.access_token}; '
+        f'{settings.REFRESH_TOKEN_COOKIE}={refresh}'
+    )
+    return session, f'{session}; {settings.STAFF_ACCESS_TOKEN_COOKIE}={staff_access}'
+
+
+def bench_cookies(iterations=20000):
+    """Default token profile versus ``JWT_COMPACT_TOKENS``: cookie bytes and per-request parsing."""
+    user, staff = User(id=123456), User(id=42)
+    stock_session, stock_diagnostic = _session_cookies(AccessToken, RefreshToken, user, staff)
+    compact_session, compact_diagnostic = _session_cookies(
+        CompactAccessToken, CompactRefreshToken, user, staff
+    )
+
+    def authenticate(header, access_class):
+        return access_class(parse_cookie(header)[settings.ACCESS_TOKEN_COOKIE])
+
+    return [
+        ('session Cookie header', len(stock_session), len(compact_session), 'bytes'),
+        ('diagnostic Cookie header', len(stock_diagnostic), len(compact_diagnostic), 'bytes'),
+        ('parse Cookie header', _per_op(lambda: parse_cookie(stock_diagnostic), iterations),
+         _per_op(lambda: parse_cookie(compact_diagnostic), iterations), 's/op'),
+        ('parse + verify access', _per_op(lambda: authenticate(stock_session, AccessToken), iterations),
+         _per_op(lambda: authenticate(compact_session, CompactAccessToken), iterations), 's/op'),
+    ]
+
+
+_STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import django
+django.setup()
+from django.test import Client
+Client().get('/api/auth/diagnostic-info/')
+print(time.perf_counter() - started)
+"""
+
+_REQUEST_SCRIPT = """
+import sys, time
+import django
+django.setup()
+from django.test import Client
+client = Client()
+client.get('/api/auth/diagnostic-info/')
+iterations = int(sys.argv[1])
+started = time.perf_counter()
+for _ in range(iterations):
+    client.get('/api/auth/diagnostic-info/')
+print((time.perf_counter() - started) / iterations)
+"""
+
+
+def _run_profile(settings_module, script, *args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    output = subprocess.run(
+        [sys.executable, '-c', script, *args],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def bench_profile(iterations=2000, startups=10):
+    """Full settings (``backend.settings``) versus the lean ``backend.settings_api``.
+
+    Each profile runs in fresh interpreters: startup is the time to set up
+    Django and serve the first request (loading apps, middleware and the
+    URLconf, best of ``startups`` runs); request overhead is a cheap
+    unauthenticated request (no DB access) through the whole middleware stack.
+    """
+    rows = []
+    for case, script, args, repeat in (
+        ('worker startup', _STARTUP_SCRIPT, (), startups),
+        ('request overhead', _REQUEST_SCRIPT, (str(iterations),), 1),
+    ):
+        baseline, candidate = (
+            min(_run_profile(module, script, *args) for _ in range(repeat))
+            for module in ('backend.settings', 'backend.settings_api')
+        )
+        rows.append((case, baseline, candidate, 's/op'))
+    return rows
+
+
+def _stock_search(query, limit):
+    """The original single-query search: ranked ``ORDER BY`` over every match, then a substring scan."""
+    def fields(lookup):
+        condition = Q()
+        for field in search.SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__{lookup}': query})
+        return condition
+
+    customers = User.objects.filter(is_staff=False, is_active=True)
+    rank = Case(
+        When(username__iexact=query, then=Value(0)),
+        When(username__istartswith=query, then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+    results = list(user_values(customers.filter(fields('istartswith')).annotate(rank=rank).order_by('rank', 'username'))[:limit])
+    if len(results) < limit and len(query) >= 3:
+        results += user_values(
+            customers.filter(fields('icontains')).exclude(fields('istartswith'))
+            .exclude(id__in=[r['id'] for r in results]).order_by('username')
+        )[:limit - len(results)]
+    return results
+
+
+_FIRST_NAMES = (
+    'Anna', 'Annabelle', 'Adam', 'Bob', 'Carol', 'Dave', 'Eve', 'Frank', 'Grace', 'Hannah',
+    'Ivan', 'Julia', 'Karol', 'Lena', 'Marek', 'Nina', 'Olga', 'Piotr', 'Rita', 'Zofia',
+)
+_LAST_NAMES = (
+    'Nowak', 'Kowalska', 'Smith', 'Hannaford', 'Jones', 'Lewandowski', 'Wojcik', 'Kaminska',
+    'Brown', 'Zielinski', 'Szymanska', 'Wozniak', 'Dabrowski', 'Kozlowska', 'Mazur', 'Krawczyk',
+)
+
+
+def _bench_customers(count):
+    rng = random.Random(0)
+    for i in range(count):
+        username = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))) + str(i)
+        yield User(
+            username=username, email=f'{username}@example.com', password='!',
+            first_name=rng.choice(_FIRST_NAMES), last_name=rng.choice(_LAST_NAMES),
+        )
+
+
+def bench_search(iterations=5, users=1_000_000, limit=20):
+    """Original single-query search versus ``search_customers`` (database, then in-process index).
+
+    Creates ``users`` customers in a transaction that is rolled back.  The
+    queries cover one- and two-letter prefixes with many matches, a common
+    name, and 3+ character queries with few or no prefix matches.  Those
+    used to fall through to the substring scan.  The typeahead target is
+    10 ms per query.
+    """
+    queries = ('a', 'an', 'anna', 'annab', 'zzzzq')
+    rows = []
+    with transaction.atomic():
+        batch = []
+        for user in _bench_customers(users):
+            batch.append(user)
+            if len(batch) == 10000:
+                User.objects.bulk_create(batch)
+                batch = []
+        User.objects.bulk_create(batch)
+
+        stock = {query: _per_op(lambda: _stock_search(query, limit), iterations) for query in queries}
+        with override_settings(USER_SEARCH_INDEX=False):
+            for query in queries:
+                rows.append((
+                    f'q={query!r} database', stock[query],
+                    _per_op(lambda: search.search_customers(query, limit), iterations), 's/op',
+                ))
+
+        index = search.prefix_index
+        try:
+            started = time.perf_counter()
+            index.build()
+            rows.append(('prefix index build', None, time.perf_counter() - started, 's/op'))
+            with override_settings(USER_SEARCH_INDEX=True):
+                for query in queries:
+                    rows.append((
+                        f'q={query!r} index', stock[query],
+                        _per_op(lambda: search.search_customers(query, limit), iterations), 's/op',
+                    ))
+        finally:
+            index.__init__()
+        transaction.set_rollback(True)
+    return rows
+
+
+SUITES = {
+    'codec': bench_codec,
+    'cookies': bench_cookies,
+    'json': bench_json,
+    'profile': bench_profile,
+    'search': bench_search,
+    'serialization': bench_serialization,
+}
+
+# Suites that insert rows; run only with ``benchmark --with-db``.
+DATABASE_SUITES = ('search', 'serialization')
@@ -0,0 +1,210 @@
+"""
+Specialised HS256 JWT codec for the fixed token configuration used here.
+
+PyJWT re-serialises the header, looks up the algorithm and re-prepares the
+key on every call.  With a single algorithm and a single key all of that can
+be done once, leaving only the payload JSON and the HMAC per token.  Output is
+byte-for-byte identical to ``jwt.encode(payload, key, algorithm='HS256')``,
+and tokens with any other header are handed back to PyJWT, so the codec can
+be switched on and off (``JWT_FAST_CODEC``) without invalidating sessions.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+
+from django.utils.translation import gettext_lazy as _
+from jwt import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidIssuedAtError,
+    InvalidSignatureError,
+    InvalidTokenError,
+)
+
+try:
+    from jwt.exceptions import InvalidJTIError, InvalidSubjectError
+except ImportError:  # PyJWT < 2.10 does not check the sub and jti types
+    InvalidJTIError = InvalidSubjectError = None
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64decode(data, name):
+    """Decode one base64url segment as strictly as PyJWT does."""
+    stripped = data.rstrip(b'=')
+    padding = len(data) - len(stripped)
+    if padding > 2 or (padding and len(data) % 4) or b'+' in stripped or b'/' in stripped:
+        raise DecodeError(f'Invalid {name} padding')
+    try:
+        return base64.b64decode(stripped + b'=' * (-len(stripped) % 4), altchars=b'-_', validate=True)
+    except (TypeError, binascii.Error):
+        raise DecodeError(f'Invalid {name} padding')
+
+
+class UnsupportedToken(Exception):
+    """The token is well-formed but not in the shape this codec handles."""
+
+
+class HS256Codec:
+    """Encode and verify JWTs with a pre-computed header segment and HMAC key.
+
+    Verification failures raise the same ``jwt.InvalidTokenError`` subclasses
+    PyJWT would; tokens whose header differs from the canonical one raise
+    ``UnsupportedToken`` so callers can fall back to the generic decoder.
+    """
+
+    algorithm = 'HS256'
+    header = {'alg': 'HS256', 'typ': 'JWT'}
+
+    def __init__(self, key):
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        self._mac = hmac.new(key, digestmod=hashlib.sha256)
+        self._header_segment = _b64encode(
+            json.dumps(self.header, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        )
+
+    def encode(self, payload):
+        """Return the signed compact serialisation of ``payload``."""
+        payload_segment = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        signing_input = self._header_segment + b'.' + payload_segment
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return (signing_input + b'.' + _b64encode(mac.digest())).decode('ascii')
+
+    def decode(self, token, verify=True, leeway=0):
+        """Verify ``token`` and return its payload dictionary.
+
+        Mirrors the checks PyJWT performs for our configuration, in the same
+        order: segment decoding, signature, then ``iat``, ``nbf`` and ``exp``
+        with ``leeway`` seconds of slack and the ``sub`` and ``jti`` types.
+        ``FastCodecTests`` runs malformed and tampered tokens through both.
+        """
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        try:
+            signing_input, signature_segment = token.rsplit(b'.', 1)
+            header_segment, payload_segment = signing_input.split(b'.', 1)
+        except ValueError:
+            raise DecodeError('Not enough segments')
+        if header_segment != self._header_segment:
+            raise UnsupportedToken()
+        payload_json = _b64decode(payload_segment, 'payload')
+        signature = _b64decode(signature_segment, 'crypto')
+
+        if verify:
+            mac = self._mac.copy()
+            mac.update(signing_input)
+            if not hmac.compare_digest(signature, mac.digest()):
+                raise InvalidSignatureError('Signature verification failed')
+
+        try:
+            payload = json.loads(payload_json)
+        except (ValueError, RecursionError) as e:
+            raise DecodeError(f'Invalid payload string: {e}')
+        if not isinstance(payload, dict):
+            raise DecodeError('Invalid payload string: must be a json object')
+
+        if verify:
+            self._validate_claims(payload, leeway)
+        return payload
+
+    @staticmethod
+    def _validate_claims(payload, leeway):
+        now = time.time()
+        if 'iat' in payload:
+            try:
+                iat = int(payload['iat'])
+            except (TypeError, ValueError, OverflowError):
+                raise InvalidIssuedAtError('Issued At claim (iat) must be an integer.')
+            if iat > now + leeway:
+                raise ImmatureSignatureError('The token is not yet valid (iat)')
+        if 'nbf' in payload:
+            try:
+                nbf = int(payload['nbf'])
+            except (TypeError, ValueError, OverflowError):
+                raise DecodeError('Not Before claim (nbf) must be an integer.')
+            if nbf > now + leeway:
+                raise ImmatureSignatureError('The token is not yet valid (nbf)')
+        if 'exp' in payload:
+            try:
+                exp = int(payload['exp'])
+            except (TypeError, ValueError, OverflowError):
+                raise DecodeError('Expiration Time claim (exp) must be an integer.')
+            if exp <= now - leeway:
+                raise ExpiredSignatureError('Signature has expired')
+        if InvalidSubjectError is not None:
+            if 'sub' in payload and not isinstance(payload['sub'], str):
+                raise InvalidSubjectError('Subject must be a string')
+            if 'jti' in payload and not isinstance(payload['jti'], str):
+                raise InvalidJTIError('JWT ID must be a string')
+
+
+class FastTokenBackend(TokenBackend):
+    """
+    simplejwt ``TokenBackend`` that routes HS256 tokens through ``HS256Codec``.
+
+    Configurations the codec does not cover (other algorithms, audience or
+    issuer claims, JWKS) use the stock PyJWT path unchanged.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.codec = None
+        if (
+            self.algorithm == HS256Codec.algorithm
+            and self.audience is None
+            and self.issuer is None
+            and self.jwks_client is None
+        ):
+            self.codec = HS256Codec(self.signing_key)
+
+    def encode(self, payload):
+        if self.codec is None:
+            return super().encode(payload)
+        return self.codec.encode(payload)
+
+    def decode(self, token, verify=True):
+        if self.codec is None:
+            return super().decode(token, verify=verify)
+
+        leeway = self.leeway
+        if isinstance(leeway, timedelta):
+            leeway = leeway.total_seconds()
+        try:
+            return self.codec.decode(token, verify=verify, leeway=leeway)
+        except UnsupportedToken:
+            return super().decode(token, verify=verify)
+        except InvalidTokenError:
+            raise TokenBackendError(_('Token is invalid or expired'))
+
+
+def build_token_backend(fast=True):
+    """Return a token backend configured from ``SIMPLE_JWT``."""
+    backend_class = FastTokenBackend if fast else TokenBackend
+    return backend_class(
+        api_settings.ALGORITHM,
+        api_settings.SIGNING_KEY,
+        api_settings.VERIFYING_KEY,
+        api_settings.AUDIENCE,
+        api_settings.ISSUER,
+        api_settings.JWK_URL,
+        api_settings.LEEWAY,
+    )
+
+
+def install_fast_codec():
+    """Make every simplejwt token class encode and decode through ``FastTokenBackend``."""
+    from rest_framework_simplejwt.tokens import Token
+
+    Token._token_backend = build_token_backend(fast=True)
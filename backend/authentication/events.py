@@ -0,0 +1,123 @@
+"""
+Structured auth-event log (logins, refreshes, code redemptions, revocations).
+
+Views call ``emit(event, request, **fields)``.  Records go onto a bounded
+in-memory queue through ``DropCountingQueueHandler``; a ``QueueListener``
+thread formats them as one compact JSON object per line and writes them to
+``AUTH_EVENT_LOG``.  The request thread never waits on I/O: when the queue is
+full the record is dropped and counted instead, and the count is written as
+an ``events_dropped`` record when the listener stops.  ``start`` is called
+from ``AuthenticationConfig.ready`` and registers ``stop`` with ``atexit`` so
+queued records are drained when the worker shuts down.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger('authentication.events')
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Format an event record as ``{"ts": ..., "event": ..., <fields>}``."""
+
+    def format(self, record):
+        event = {'ts': round(record.created, 3), 'event': record.getMessage()}
+        event.update(getattr(record, 'event_fields', {}))
+        return json.dumps(event, separators=(',', ':'), default=str)
+
+
+class DropCountingQueueHandler(QueueHandler):
+    """``QueueHandler`` that never blocks: records that do not fit are counted and dropped."""
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; only snapshot the record.
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """``QueueListener`` whose ``stop`` waits for room instead of failing on a full queue."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def emit(event, request=None, **fields):
+    """Log auth event ``event`` with ``fields`` (and the client address of ``request``)."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    if request is not None:
+        fields['ip'] = request.META.get('REMOTE_ADDR')
+    logger.info(event, extra={'event_fields': fields})
+
+
+def _target_handler(destination):
+    if destination == '-':
+        handler = logging.StreamHandler(sys.stderr)
+    else:
+        handler = logging.FileHandler(destination, encoding='utf-8')
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+
+def start(destination, queue_size):
+    """Route ``authentication.events`` through a queue to ``destination`` (a path, or ``-`` for stderr)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    queue_handler = DropCountingQueueHandler(queue.Queue(maxsize=queue_size))
+    _listener = DrainingQueueListener(queue_handler.queue, _target_handler(destination))
+    _listener.queue_handler = queue_handler
+    _listener.start()
+
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    atexit.register(stop)
+
+
+def stop():
+    """Drain queued events, report drops and detach the pipeline."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    atexit.unregister(stop)
+    logger.removeHandler(listener.queue_handler)
+    logger.setLevel(logging.NOTSET)
+    listener.stop()
+
+    dropped = listener.queue_handler.dropped
+    for handler in listener.handlers:
+        if dropped:
+            handler.handle(logger.makeRecord(
+                logger.name, logging.WARNING, __file__, 0, 'events_dropped', None, None,
+                extra={'event_fields': {'count': dropped}},
+            ))
+        handler.close()
+
+
+def dropped_count():
+    """Number of events dropped because the queue was full since ``start``."""
+    return _listener.queue_handler.dropped if _listener is not None else 0
@@ -0,0 +1,256 @@
+"""
+Scripted virtual users that replay the two frontends' session flows.
+
+* customer: login -> me -> refresh (repeated) -> logout
+* intranet: login?require_staff=true -> users -> diagnostic-login, then, in a
+  fresh cookie jar standing in for the new customer-portal tab,
+  exchange -> diagnostic-info
+
+Each virtual user owns its cookie jar and its account (``ensure_accounts``),
+so the run exercises many users' rows rather than contending on one.
+Requests go either through Django's
+test ``Client`` (in-process, no server needed) or over HTTP to a running
+server; both transports expose the same ``request`` method.
+
+The in-process transport shares one interpreter (and, on SQLite, one
+database file with a single writer) between all virtual users, so it is a
+smoke test of the flows rather than a measure of concurrency.  Point the
+load generator at a real server for realistic numbers.
+"""
+import http.cookiejar
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+
+API_PREFIX = '/api/auth'
+
+# Seconds a SQLite connection waits for the write lock before failing.
+SQLITE_BUSY_TIMEOUT = 30
+
+
+def account_username(prefix, flow, index):
+    """Username of virtual user ``index`` running ``flow``."""
+    return f'{prefix}-{flow}-{index}'
+
+
+def ensure_accounts(prefix, password, flow_names):
+    """Create the accounts of the virtual users that do not exist yet.
+
+    ``flow_names`` lists the flow of every virtual user, by index.  Intranet
+    users get staff accounts.  Returns the number of accounts created.
+    """
+    wanted = {
+        account_username(prefix, flow, index): flow == 'intranet'
+        for index, flow in enumerate(flow_names)
+    }
+    existing = set(User.objects.filter(username__in=wanted).values_list('username', flat=True))
+    hashed = make_password(password)
+    created = User.objects.bulk_create(
+        [User(username=username, password=hashed, is_staff=is_staff)
+         for username, is_staff in wanted.items() if username not in existing],
+        batch_size=1000,
+    )
+    return len(created)
+
+
+@contextmanager
+def in_process_run():
+    """Prepare the process for virtual users on ``ClientSession``.
+
+    Gives SQLite connections opened during the run a busy timeout, and mutes
+    the ``django.request`` error log: failed requests are already counted
+    per step, and a traceback per failure would bury the report.  Both are
+    restored afterwards.
+    """
+    settings_dict = connection.settings_dict
+    had_options, options = 'OPTIONS' in settings_dict, settings_dict.get('OPTIONS')
+    if connection.vendor == 'sqlite':
+        settings_dict['OPTIONS'] = {'timeout': SQLITE_BUSY_TIMEOUT, **(options or {})}
+    request_logger = logging.getLogger('django.request')
+    disabled = request_logger.disabled
+    request_logger.disabled = True
+    try:
+        yield
+    finally:
+        request_logger.disabled = disabled
+        if had_options:
+            settings_dict['OPTIONS'] = options
+        else:
+            settings_dict.pop('OPTIONS', None)
+
+
+class ClientSession:
+    """In-process transport backed by Django's test client.
+
+    Sessions of one run may share ``write_lock``; requests other than GET
+    then run one at a time.  The command passes one on SQLite, where a
+    transaction that reads and then writes (``exchange/``) fails straight
+    away when another connection is writing, whatever the busy timeout.
+    """
+
+    def __init__(self, write_lock=None):
+        self.client = Client(raise_request_exception=False)
+        self.write_lock = write_lock
+
+    def request(self, method, path, body=None):
+        kwargs = {}
+        if body is not None:
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'}
+        send = getattr(self.client, method.lower())
+        if method != 'GET' and self.write_lock is not None:
+            with self.write_lock:
+                response = send(API_PREFIX + path, **kwargs)
+        else:
+            response = send(API_PREFIX + path, **kwargs)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return response.status_code, data
+
+    def close(self):
+        # Each worker thread holds its own DB connection.
+        connection.close()
+
+
+class HttpSession:
+    """HTTP transport with its own cookie jar, for a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        req = urllib.request.Request(
+            self.base_url + API_PREFIX + path,
+            data=data if method != 'GET' else None,
+            method=method,
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with self.opener.open(req) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+    def close(self):
+        pass
+
+
+class Stats:
+    """Thread-safe per-step latency and error collector."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, step, seconds, ok):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def report(self, elapsed):
+        """Return one row per step: count, errors, req/s and latency percentiles (ms)."""
+        rows = []
+        for step, samples in self.latencies.items():
+            ordered = sorted(samples)
+            rows.append({
+                'step': step,
+                'count': len(ordered),
+                'errors': self.errors[step],
+                'error_rate': self.errors[step] / len(ordered),
+                'throughput': len(ordered) / elapsed if elapsed else 0.0,
+                'p50': _percentile(ordered, 50) * 1000,
+                'p95': _percentile(ordered, 95) * 1000,
+                'p99': _percentile(ordered, 99) * 1000,
+                'max': ordered[-1] * 1000,
+            })
+        return rows
+
+
+def _percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _step(stats, session, step, method, path, body=None, expect=200):
+    started = time.perf_counter()
+    try:
+        status, data = session.request(method, path, body)
+    except Exception:
+        status, data = None, None
+    stats.record(step, time.perf_counter() - started, status == expect)
+    return status, data
+
+
+def customer_flow(make_session, stats, options, index):
+    session = make_session()
+    try:
+        status, _ = _step(stats, session, 'customer login', 'POST', '/login/', {
+            'username': account_username(options['account_prefix'], 'customer', index),
+            'password': options['password'],
+        })
+        if status != 200:
+            return
+        _step(stats, session, 'customer me', 'GET', '/me/')
+        for _ in range(options['refreshes']):
+            if options['think_time']:
+                time.sleep(options['think_time'])
+            _step(stats, session, 'customer refresh', 'POST', '/refresh/')
+        _step(stats, session, 'customer logout', 'POST', '/logout/')
+    finally:
+        session.close()
+
+
+def intranet_flow(make_session, stats, options, index):
+    staff = make_session()
+    tab = make_session()
+    try:
+        status, _ = _step(stats, staff, 'intranet login', 'POST', '/login/?require_staff=true', {
+            'username': account_username(options['account_prefix'], 'intranet', index),
+            'password': options['password'],
+        })
+        if status != 200:
+            return
+        status, customers = _step(stats, staff, 'intranet users', 'GET', '/users/')
+        if status != 200 or not customers:
+            return
+        # Spread the diagnostic sessions over the customers.
+        status, diag = _step(stats, staff, 'intranet diagnostic-login', 'POST', '/diagnostic-login/', {
+            'customer_id': customers[index % len(customers)]['id'],
+        })
+        if status != 200:
+            return
+        status, _ = _step(stats, tab, 'intranet exchange', 'POST', '/exchange/', {'code': diag['code']})
+        if status != 200:
+            return
+        _step(stats, tab, 'intranet diagnostic-info', 'GET', '/diagnostic-info/')
+    finally:
+        staff.close()
+        tab.close()
+
+
+FLOWS = {
+    'customer': customer_flow,
+    'intranet': intranet_flow,
+}
@@ -0,0 +1,74 @@
+"""
+Management command to run the micro-benchmarks in ``authentication.benchmarks``.
+
+Usage:
+    python manage.py benchmark            # every suite that leaves the database alone
+    python manage.py benchmark codec --iterations 50000
+    python manage.py benchmark search --with-db --users 100000
+
+Suites that insert rows (``DATABASE_SUITES``) need ``--with-db`` and run
+against a throwaway test database, never the configured one.  A
+``baseline`` of ``-`` marks a case that only exists on the optimised path.
+"""
+import inspect
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.benchmarks import DATABASE_SUITES, SUITES, throwaway_database
+
+
+class Command(BaseCommand):
+    help = 'Compare stock and optimised auth code paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help=f"Suites to run ({', '.join(SUITES)})")
+        parser.add_argument('--iterations', type=int, help='Override the per-case iteration count')
+        parser.add_argument('--users', type=int, help='Override the number of users of the suites that take one')
+        parser.add_argument('--with-db', action='store_true',
+                            help=f"Also allow the suites that insert rows ({', '.join(DATABASE_SUITES)}), "
+                                 f"run against a throwaway test database")
+
+    def handle(self, *args, **options):
+        names = options['suites'] or [
+            name for name in SUITES if options['with_db'] or name not in DATABASE_SUITES
+        ]
+        unknown = [name for name in names if name not in SUITES]
+        if unknown:
+            raise CommandError(f"Unknown suite(s): {', '.join(unknown)}")
+        writing = [name for name in names if name in DATABASE_SUITES]
+        if writing and not options['with_db']:
+            raise CommandError(f"Suite(s) {', '.join(writing)} insert rows; pass --with-db to run them")
+
+        kwargs = {}
+        if options['iterations']:
+            kwargs['iterations'] = options['iterations']
+
+        with throwaway_database() if writing else nullcontext():
+            for name in names:
+                self._run(name, kwargs, options['users'])
+
+    def _run(self, name, kwargs, users):
+        suite = SUITES[name]
+        if users and 'users' in inspect.signature(suite).parameters:
+            kwargs = {**kwargs, 'users': users}
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n[{name}]'))
+        self.stdout.write(f"  {'case':<28} {'baseline':>14} {'candidate':>14} {'ratio':>8}")
+        for case, baseline, candidate, unit in suite(**kwargs):
+            if baseline is None:
+                ratio = '-'
+            else:
+                ratio = f'{baseline / candidate:.2f}x' if candidate else 'inf'
+            self.stdout.write(
+                f'  {case:<28} {_fmt(baseline, unit):>14} {_fmt(candidate, unit):>14} {ratio:>8}'
+            )
+
+
+def _fmt(value, unit):
+    if value is None:
+        return '-'
+    if unit == 's/op':
+        if value >= 1e-3:
+            return f'{value * 1e3:.2f} ms/op'
+        return f'{value * 1e6:.2f} us/op'
+    return f'{value:,.0f} {unit}'
@@ -0,0 +1,76 @@
+"""
+Management command that reports diagnostic-session analytics per staff user.
+
+Usage:
+    python manage.py diagnostic_report
+    python manage.py diagnostic_report --since 2026-01-01 --until 2026-02-01
+    python manage.py diagnostic_report --detail --output sessions.ndjson
+
+Prints sessions started, redeemed, expired unused and pending, and the
+average time to redeem, per staff user and in total; all aggregation runs in
+the database (see ``authentication.analytics``).  ``--detail`` instead
+streams one JSON object per session to ``--output`` (or stdout).
+"""
+import json
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from authentication.analytics import session_rows, session_stats
+
+
+def _parse_moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Not an ISO date or datetime: {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Report diagnostic sessions started, redeemed and expired per staff user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=_parse_moment, help='Only codes created at or after this date/datetime')
+        parser.add_argument('--until', type=_parse_moment, help='Only codes created before this date/datetime')
+        parser.add_argument('--staff-user', type=int, help='Only sessions started by this staff user ID')
+        parser.add_argument('--detail', action='store_true', help='Stream individual sessions as NDJSON')
+        parser.add_argument('--output', help='Output file for --detail (default: stdout)')
+
+    def handle(self, *args, **options):
+        filters = {
+            'since': options['since'],
+            'until': options['until'],
+            'staff_user_id': options['staff_user'],
+        }
+        if options['detail']:
+            out = open(options['output'], 'w') if options['output'] else self.stdout
+            try:
+                for row in session_rows(**filters):
+                    out.write(json.dumps(row) + '\n')
+            finally:
+                if options['output']:
+                    out.close()
+            return
+
+        report = session_stats(**filters)
+        self.stdout.write(
+            f"  {'staff':<20} {'started':>9} {'redeemed':>9} {'expired':>9} {'pending':>9} {'avg redeem':>11}"
+        )
+        for row in report['staff']:
+            self._write_row(row['staff_username'], row)
+        self._write_row('total', report['totals'])
+
+    def _write_row(self, label, stats):
+        avg = stats['avg_seconds_to_redeem']
+        avg = f'{avg:.1f}s' if avg is not None else '-'
+        self.stdout.write(
+            f"  {label:<20} {stats['started']:>9} {stats['redeemed']:>9} "
+            f"{stats['expired_unused']:>9} {stats['pending']:>9} {avg:>11}"
+        )
@@ -0,0 +1,92 @@
+"""
+Management command that replays the frontends' session flows under load.
+
+Usage:
+    python manage.py loadgen --users 1000 --concurrency 50
+    python manage.py loadgen --flow customer --refreshes 3 --url http://localhost:8000
+
+Every virtual user logs in to its own account, ``<prefix>-customer-N`` or
+(staff) ``<prefix>-intranet-N``, created in the configured database before
+the run if missing; with ``--url`` the server must use that database too.
+Intranet users diagnose the customers that ``users/`` lists, spread by index.
+
+Without ``--url`` requests run in-process through Django's test client
+against the configured database.  That checks the flows end to end, but all virtual users share one interpreter and
+on SQLite writes are serialised, so use ``--url`` against a real server to
+measure behaviour under concurrency.  Reports throughput, error rate and
+latency percentiles for every step.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from authentication.loadgen import (
+    FLOWS, ClientSession, HttpSession, Stats, ensure_accounts, in_process_run,
+)
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent virtual users running the frontend session flows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Total virtual users to run')
+        parser.add_argument('--concurrency', type=int, default=10, help='Virtual users running at once')
+        parser.add_argument('--flow', choices=[*FLOWS, 'mixed'], default='mixed',
+                            help='Flow to run; "mixed" alternates customer and intranet users')
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process test client)')
+        parser.add_argument('--refreshes', type=int, default=1, help='Token refreshes per customer session')
+        parser.add_argument('--think-time', type=float, default=0.0,
+                            help='Seconds to wait before each refresh')
+        parser.add_argument('--account-prefix', default='loadgen',
+                            help='Virtual user N logs in as <prefix>-customer-N or <prefix>-intranet-N')
+        parser.add_argument('--password', default='loadgen123', help='Password of the virtual users\' accounts')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            make_session = partial(HttpSession, options['url'])
+            run = nullcontext()
+        else:
+            # A lock for this run only; see ClientSession.
+            write_lock = threading.Lock() if connection.vendor == 'sqlite' else None
+            make_session = partial(ClientSession, write_lock)
+            run = in_process_run()
+
+        if options['flow'] == 'mixed':
+            flow_names = ['customer', 'intranet']
+        else:
+            flow_names = [options['flow']]
+        assigned = [flow_names[i % len(flow_names)] for i in range(options['users'])]
+        created = ensure_accounts(options['account_prefix'], options['password'], assigned)
+        if created:
+            self.stderr.write(f'Created {created} virtual user accounts ({options["account_prefix"]}-*)')
+
+        stats = Stats()
+        started = time.perf_counter()
+        with run, ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            futures = [
+                pool.submit(FLOWS[flow], make_session, stats, options, i)
+                for i, flow in enumerate(assigned)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{options['users']} virtual users, concurrency {options['concurrency']}, {elapsed:.2f}s"
+        ))
+        self.stdout.write(
+            f"  {'step':<28} {'count':>7} {'err%':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for row in stats.report(elapsed):
+            line = (
+                f"  {row['step']:<28} {row['count']:>7} {row['error_rate'] * 100:>5.1f}% "
+                f"{row['throughput']:>8.1f} {row['p50']:>8.1f} {row['p95']:>8.1f} "
+                f"{row['p99']:>8.1f} {row['max']:>8.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
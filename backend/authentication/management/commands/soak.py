@@ -0,0 +1,74 @@
+"""
+Management command that soak-tests the auth views for memory growth.
+
+Usage:
+    python manage.py soak                                   # 10,000 cycles
+    python manage.py soak --cycles 1000000 --warmup 20000 --sample-every 10000
+
+Runs login/me/refresh/logout and diagnostic-login/exchange/diagnostic-info
+cycles in-process (see ``authentication.soak``) against the configured
+database, using two temporary users that are deleted afterwards.  Exits with
+an error if live allocations or RSS keep growing after warm-up, and lists
+the top allocation sites per endpoint.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.soak import Soak
+
+
+class Command(BaseCommand):
+    help = 'Run the auth session cycle repeatedly and fail on memory growth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycles', type=int, default=10000, help='Session cycles to run')
+        parser.add_argument('--warmup', type=int, default=1000, help='Cycles to run before sampling')
+        parser.add_argument('--sample-every', type=int, default=500, help='Cycles between memory samples')
+        parser.add_argument('--max-growth', type=float, default=1.0,
+                            help='Allowed growth of live allocated blocks after warm-up, per cycle')
+        parser.add_argument('--max-rss-growth', type=float, default=1024.0,
+                            help='Allowed RSS growth after warm-up, in bytes per cycle')
+        parser.add_argument('--top', type=int, default=5, help='Allocation sites to list per endpoint')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Hash passwords with the configured hashers instead of MD5')
+
+    def handle(self, *args, **options):
+        if options['cycles'] - options['warmup'] < 2 * options['sample_every']:
+            raise CommandError('Need at least two samples after warm-up; raise --cycles or lower --sample-every.')
+
+        try:
+            soak = Soak(fast_hasher=not options['real_hasher']).run(
+                options['cycles'], options['warmup'], options['sample_every'],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{options['cycles']} cycles, {options['warmup']} warm-up, "
+            f"sampled every {options['sample_every']}"
+        ))
+        self.stdout.write(f"  {'cycle':>10} {'blocks':>12} {'RSS KiB':>12}")
+        for cycle, blocks, rss in soak.samples:
+            rss_kib = f'{rss / 1024:,.0f}' if rss is not None else 'n/a'
+            self.stdout.write(f'  {cycle:>10} {blocks:>12,} {rss_kib:>12}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nTop allocation sites still held after each step'))
+        for step, sites in soak.top_sites(options['top']).items():
+            self.stdout.write(f'  {step}')
+            for site, size in sites:
+                self.stdout.write(f'    {size / 1024:>10,.1f} KiB  {site}')
+
+        block_growth, rss_growth = soak.growth()
+        self.stdout.write(
+            f'\nGrowth after warm-up: {block_growth:,.2f} blocks/cycle, RSS {rss_growth:,.1f} B/cycle'
+        )
+
+        failures = []
+        if soak.errors:
+            failures.append('failed requests: ' + ', '.join(f'{step} x{n}' for step, n in soak.errors.items()))
+        if block_growth > options['max_growth']:
+            failures.append(f"live allocations grow {block_growth:,.2f} blocks/cycle (max {options['max_growth']:,.2f})")
+        if rss_growth > options['max_rss_growth']:
+            failures.append(f"RSS grows {rss_growth:,.1f} B/cycle (max {options['max_rss_growth']:,.1f})")
+        if failures:
+            raise CommandError('Soak test failed: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No memory growth detected.'))
@@ -0,0 +1,60 @@
+"""
+Management command to verify many JWTs offline, e.g. tokens pulled from logs.
+
+Usage:
+    python manage.py verify_tokens tokens.txt
+    grep -o 'eyJ[^" ]*' access.log | python manage.py verify_tokens --processes 8 --output results.ndjson
+
+Reads one token per line from a file (or stdin, the default ``-``) and writes
+one JSON object per token (``line``, ``valid``, ``reason``, ``token_type``,
+``user_id``, ``jti``, ``exp``) to ``--output`` (or stdout), streaming in both
+directions.  A summary of the reasons is reported on stderr.  Only the token
+itself is checked; see ``authentication.verification``.
+"""
+import json
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.verification import verify_token_stream
+
+
+class Command(BaseCommand):
+    help = 'Verify JWTs read one per line from a file or stdin and write NDJSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-', help='File of tokens, one per line (default: stdin)')
+        parser.add_argument('--processes', type=int, default=0,
+                            help='Spread verification across this many worker processes')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Tokens per worker task')
+        parser.add_argument('--output', help='NDJSON output file (default: stdout)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        source = sys.stdin if options['input'] == '-' else open(options['input'], encoding='utf-8', errors='replace')
+        out = open(options['output'], 'w') if options['output'] else self.stdout
+        reasons = Counter()
+        try:
+            for result in verify_token_stream(source, options['processes'], options['chunk_size']):
+                reasons[result['reason'] or 'valid'] += 1
+                out.write(json.dumps(result) + '\n')
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if options['output']:
+                out.close()
+
+        elapsed = time.perf_counter() - started
+        total = sum(reasons.values())
+        self.stderr.write(
+            f"Verified {total} tokens in {elapsed:.3f}s ({total / elapsed if elapsed else 0:.0f} tokens/s): "
+            f"{reasons.pop('valid', 0)} valid, {sum(reasons.values())} invalid",
+            style_func=self.style.SUCCESS,
+        )
+        for reason, count in reasons.most_common():
+            self.stderr.write(f'  {reason}: {count}')
@@ -0,0 +1,114 @@
+"""
+Middleware for cookie-authenticated API requests.
+"""
+import cProfile
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+
+from .backends import CookieJWTAuthentication
+from .profiling import save_report
+
+UNSAFE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+
+class TrustedOriginMiddleware:
+    """
+    Reject cross-site state-changing requests that carry our auth cookies.
+
+    DRF views are CSRF-exempt and ``CookieJWTAuthentication`` does not check a
+    CSRF token, so the cookie-authenticated POSTs rely on the browser's
+    ``Origin`` header instead: unsafe requests that send any JWT cookie must
+    come from the serving host or from ``CORS_ALLOWED_ORIGINS``.  Requests
+    without an ``Origin`` header (non-browser clients) are let through, as are
+    requests without auth cookies, which cannot act on anyone's behalf.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.trusted_origins = frozenset(
+            list(settings.CORS_ALLOWED_ORIGINS) + list(settings.CSRF_TRUSTED_ORIGINS)
+        )
+        self.cookie_names = (
+            settings.ACCESS_TOKEN_COOKIE,
+            settings.REFRESH_TOKEN_COOKIE,
+            settings.STAFF_ACCESS_TOKEN_COOKIE,
+        )
+
+    def __call__(self, request):
+        if request.method in UNSAFE_METHODS and not self._origin_allowed(request):
+            return JsonResponse(
+                {'detail': 'Origin not allowed.'},
+                status=403,
+            )
+        return self.get_response(request)
+
+    def _origin_allowed(self, request):
+        origin = request.META.get('HTTP_ORIGIN')
+        if origin is None:
+            return True
+        if not any(name in request.COOKIES for name in self.cookie_names):
+            return True
+        if origin in self.trusted_origins:
+            return True
+        return origin == f'{request.scheme}://{request.get_host()}'
+
+
+class ProfilingMiddleware:
+    """
+    Profile a sample of requests with ``cProfile`` and store the reports.
+
+    Enabled by ``PROFILING_ENABLED``.  A request is profiled with probability
+    ``PROFILING_SAMPLE_RATE``, or always when a staff user (by access-token
+    cookie) sends the ``PROFILING_TRIGGER_HEADER``.  Reports are tagged with
+    the view class name and kept in a bounded ring directory; see
+    ``authentication.profiling`` and the ``profiles/`` endpoints.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.trigger_header = 'HTTP_' + settings.PROFILING_TRIGGER_HEADER.upper().replace('-', '_')
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active on this thread
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        save_report(profiler, self._view_name(request), request.method, time.perf_counter() - started)
+        return response
+
+    def _should_profile(self, request):
+        if self.trigger_header in request.META and self._is_staff(request):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def _is_staff(request):
+        try:
+            user_auth = CookieJWTAuthentication().authenticate(request)
+            return user_auth is not None and user_auth[0].is_staff
+        except APIException:
+            return False
+
+    @staticmethod
+    def _view_name(request):
+        match = request.resolver_match
+        if match is None:
+            return 'unresolved'
+        return getattr(match.func, 'view_class', match.func).__name__
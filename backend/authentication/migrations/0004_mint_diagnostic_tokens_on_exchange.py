@@ -0,0 +1,73 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:31
+
+from django.db import migrations, models
+
+
+def noop(apps, schema_editor):
+    # Codes already in flight need no rewrite: ExchangeCodeView now mints
+    # fresh tokens on redemption, so their stored tokens are simply dropped.
+    pass
+
+
+def remint_in_flight_tokens(apps, schema_editor):
+    """On rollback, give unredeemed codes the stored tokens the old view expects."""
+    from django.conf import settings
+    from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+    DiagnosticExchangeCode = apps.get_model('authentication', 'DiagnosticExchangeCode')
+    TokenGeneration = apps.get_model('authentication', 'TokenGeneration')
+
+    in_flight = DiagnosticExchangeCode.objects.filter(used=False).select_related(
+        'customer_user', 'staff_user'
+    )
+    for exchange in in_flight.iterator():
+        generations = dict(
+            TokenGeneration.objects.filter(
+                user_id__in=[exchange.customer_user_id, exchange.staff_user_id]
+            ).values_list('user_id', 'generation')
+        )
+        refresh = RefreshToken.for_user(exchange.customer_user)
+        refresh[settings.TOKEN_GENERATION_CLAIM] = generations.get(exchange.customer_user_id, 0)
+        staff_access = AccessToken.for_user(exchange.staff_user)
+        staff_access[settings.TOKEN_GENERATION_CLAIM] = generations.get(exchange.staff_user_id, 0)
+
+        exchange.customer_access_token = str(refresh.access_token)
+        exchange.customer_refresh_token = str(refresh)
+        exchange.staff_access_token = str(staff_access)
+        exchange.save(update_fields=[
+            'customer_access_token', 'customer_refresh_token', 'staff_access_token',
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_token_generation'),
+    ]
+
+    operations = [
+        # Defaults let a rollback re-add the columns to a populated table.
+        migrations.AlterField(
+            model_name='diagnosticexchangecode',
+            name='customer_access_token',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='diagnosticexchangecode',
+            name='customer_refresh_token',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(noop, remint_in_flight_tokens),
+        migrations.RemoveField(
+            model_name='diagnosticexchangecode',
+            name='customer_access_token',
+        ),
+        migrations.RemoveField(
+            model_name='diagnosticexchangecode',
+            name='customer_refresh_token',
+        ),
+        migrations.RemoveField(
+            model_name='diagnosticexchangecode',
+            name='staff_access_token',
+        ),
+    ]
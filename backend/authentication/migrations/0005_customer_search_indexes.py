@@ -0,0 +1,38 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = ('username', 'first_name', 'last_name', 'email')
+
+
+def _index_statements(vendor):
+    """Case-insensitive prefix indexes matching Django's ``istartswith`` SQL."""
+    for column in SEARCH_COLUMNS:
+        name = f'auth_user_{column}_search_idx'
+        if vendor == 'sqlite':
+            # SQLite only uses an index for case-insensitive LIKE when it is
+            # built with the NOCASE collation.
+            yield name, f'CREATE INDEX IF NOT EXISTS {name} ON auth_user ({column} COLLATE NOCASE)'
+        elif vendor == 'postgresql':
+            # istartswith compiles to UPPER(col::text) LIKE UPPER(%s).
+            yield name, f'CREATE INDEX IF NOT EXISTS {name} ON auth_user (UPPER({column}::text) text_pattern_ops)'
+
+
+def create_search_indexes(apps, schema_editor):
+    for name, sql in _index_statements(schema_editor.connection.vendor):
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    for name, sql in _index_statements(schema_editor.connection.vendor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0004_mint_diagnostic_tokens_on_exchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.26 on 2026-10-19 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_customer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagnosticexchangecode',
+            name='redeemed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='diagnosticexchangecode',
+            index=models.Index(fields=['staff_user', 'used', 'created_at'], name='diag_codes_staff_used_idx'),
+        ),
+    ]
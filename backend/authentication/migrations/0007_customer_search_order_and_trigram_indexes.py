@@ -0,0 +1,44 @@
+from django.db import migrations
+
+SEARCH_COLUMNS = ('username', 'first_name', 'last_name', 'email')
+
+
+def _index_statements(vendor):
+    """PostgreSQL indexes for ordered prefix scans and substring matching.
+
+    SQLite needs neither: the NOCASE indexes from ``0005`` already return rows
+    in ``COLLATE NOCASE`` order, and the substring tier stays disabled there.
+    """
+    if vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        # Default operator class, so ORDER BY UPPER(col::text) can read the
+        # index in order (the text_pattern_ops index only serves LIKE).
+        name = f'auth_user_{column}_order_idx'
+        yield name, f'CREATE INDEX IF NOT EXISTS {name} ON auth_user (UPPER({column}::text))'
+        # icontains compiles to UPPER(col::text) LIKE UPPER('%q%').
+        name = f'auth_user_{column}_trgm_idx'
+        yield name, f'CREATE INDEX IF NOT EXISTS {name} ON auth_user USING gin (UPPER({column}::text) gin_trgm_ops)'
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, sql in _index_statements(schema_editor.connection.vendor):
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    for name, sql in _index_statements(schema_editor.connection.vendor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_diagnostic_session_analytics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
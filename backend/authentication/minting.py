@@ -0,0 +1,166 @@
+"""
+Bulk JWT minting for load-test fixtures and service-account provisioning.
+
+``get_tokens_for_user`` builds two simplejwt token objects per user and signs
+each through the generic backend.  Here the user IDs are fetched in a single
+``values_list`` query, the claims are assembled as plain dicts and every
+token is signed with one prepared key.  Large batches can optionally be
+spread over a process pool; workers receive only plain data so they never
+touch the ORM.  Every token carries the user's current token generation,
+exactly as ``get_tokens_for_user`` would set it, and follows the same
+token profile (``JWT_COMPACT_TOKENS``).
+
+Only customers get tokens unless ``include_staff`` is passed: a bulk mint
+must not become a way to obtain staff or superuser sessions.  The pool only
+pays off for large batches on several cores; spawning workers and shipping
+chunks back costs more than signing a few tens of thousands of tokens
+serially, hence the large default chunk size.
+"""
+import time
+from calendar import timegm
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework_simplejwt.settings import api_settings
+
+from .codec import HS256Codec
+from .tokens import COMPACT_CLAIMS, CompactTokenMixin, compact_jti, get_token_classes
+
+
+def _make_signer(algorithm, key):
+    """Return a ``payload -> str`` callable bound to a prepared key."""
+    if algorithm == HS256Codec.algorithm:
+        return HS256Codec(key).encode
+
+    def sign(payload):
+        return jwt.encode(payload, key, algorithm=algorithm)
+    return sign
+
+
+def _mint_chunk(algorithm, key, claims, now, users):
+    """Mint token pairs for ``(user_id, generation)`` pairs. Runs in the caller or a worker."""
+    sign = _make_signer(algorithm, key)
+    type_claim = claims['token_type']
+    jti_claim = claims['jti']
+    user_claim = claims['user_id']
+    generation_claim = claims['generation']
+    access_exp = now + claims['access_lifetime']
+    refresh_exp = now + claims['refresh_lifetime']
+    compact = claims['compact']
+    new_jti = compact_jti if compact else lambda: uuid4().hex
+
+    minted = []
+    for user_id, generation in users:
+        refresh = {
+            type_claim: claims['refresh_type'],
+            'exp': refresh_exp,
+            jti_claim: new_jti(),
+            user_claim: user_id,
+        }
+        access = {
+            type_claim: claims['access_type'],
+            'exp': access_exp,
+            jti_claim: new_jti(),
+            user_claim: user_id,
+        }
+        if generation or not compact:
+            refresh[generation_claim] = access[generation_claim] = generation
+        minted.append({'user_id': user_id, 'access': sign(access), 'refresh': sign(refresh)})
+    return minted
+
+
+def _claims_config():
+    access_class, refresh_class = get_token_classes()
+    compact = issubclass(access_class, CompactTokenMixin)
+    names = COMPACT_CLAIMS if compact else {}
+    return {
+        'compact': compact,
+        'token_type': names.get(api_settings.TOKEN_TYPE_CLAIM, api_settings.TOKEN_TYPE_CLAIM),
+        'jti': names.get(api_settings.JTI_CLAIM, api_settings.JTI_CLAIM),
+        'user_id': names.get(api_settings.USER_ID_CLAIM, api_settings.USER_ID_CLAIM),
+        'generation': names.get(settings.TOKEN_GENERATION_CLAIM, settings.TOKEN_GENERATION_CLAIM),
+        'access_type': access_class.token_type,
+        'refresh_type': refresh_class.token_type,
+        'access_lifetime': int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+        'refresh_lifetime': int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+    }
+
+
+def fetch_active_users(user_ids, include_staff=False):
+    """Return ``(user_id, generation)`` for the active users in ``user_ids``.
+
+    Staff users are left out unless ``include_staff`` is set.  ``user_id``
+    is the token user-ID claim value.  Only that column and the
+    joined token generation are selected.  The lookup is a single query
+    unless the database caps the number of bound parameters (SQLite), in
+    which case it is split into as few queries as the cap allows.
+    """
+    field = api_settings.USER_ID_FIELD
+    requested = list(dict.fromkeys(user_ids))
+    batch = connection.features.max_query_params or len(requested) or 1
+
+    users = User.objects.filter(is_active=True)
+    if not include_staff:
+        users = users.filter(is_staff=False)
+
+    found = []
+    for start in range(0, len(requested), batch):
+        found.extend(
+            users.filter(pk__in=requested[start:start + batch])
+            .order_by()
+            .values_list(field, 'token_generation__generation')
+        )
+    return [
+        (uid if isinstance(uid, int) else str(uid), generation or 0)
+        for uid, generation in found
+    ]
+
+
+def mint_tokens_bulk(user_ids, processes=0, chunk_size=10000, include_staff=False):
+    """Mint an access/refresh pair for every active customer in ``user_ids``.
+
+    Staff users are only included with ``include_staff``.  With ``processes``
+    > 1 signing is spread over a process pool in chunks of ``chunk_size``
+    users.  Returns a dict with the minted ``tokens``, the requested IDs that
+    were ``missing`` (unknown, inactive or excluded staff), the ``count`` of
+    tokens signed, ``elapsed`` seconds and ``tokens_per_second``.
+    """
+    started = time.perf_counter()
+    found = fetch_active_users(user_ids, include_staff=include_staff)
+
+    found_set = {uid for uid, generation in found}
+    missing = [uid for uid in dict.fromkeys(user_ids) if uid not in found_set]
+
+    algorithm = api_settings.ALGORITHM
+    key = api_settings.SIGNING_KEY
+    claims = _claims_config()
+    now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+
+    chunks = [found[i:i + chunk_size] for i in range(0, len(found), chunk_size)]
+    tokens = []
+    if processes and processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(_mint_chunk, algorithm, key, claims, now, chunk)
+                for chunk in chunks
+            ]
+            for future in futures:
+                tokens.extend(future.result())
+    else:
+        for chunk in chunks:
+            tokens.extend(_mint_chunk(algorithm, key, claims, now, chunk))
+
+    elapsed = time.perf_counter() - started
+    count = len(tokens) * 2
+    return {
+        'tokens': tokens,
+        'missing': missing,
+        'count': count,
+        'elapsed': elapsed,
+        'tokens_per_second': count / elapsed if elapsed else 0.0,
+    }
@@ -9,9 +9,9 @@ class DiagnosticExchangeCode(models.Model):
     frontend to the customer frontend. A staff member uses this to log in
     as a customer for diagnostic purposes.
 
-    Both the customer's tokens and the staff member's access token are stored
-    so that the customer frontend can authenticate as the customer while also
-    carrying the staff member's JWT for server-side audit logging.
+    Only the two user IDs are stored.  The customer's token pair and the
+    staff member's audit access token are minted when the code is redeemed,
+    so codes that are never used cost no signing and rows stay small.
     """
     code = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     staff_user = models.ForeignKey(
@@ -20,16 +20,38 @@ class DiagnosticExchangeCode(models.Model):
     customer_user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='diagnostic_codes_received'
     )
-    customer_access_token = models.TextField()
-    customer_refresh_token = models.TextField()
-    # Staff member's access token so the customer frontend can also carry
-    # the staff identity as a session cookie for audit purposes.
-    staff_access_token = models.TextField(default='')
     created_at = models.DateTimeField(auto_now_add=True)
     used = models.BooleanField(default=False)
+    redeemed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'diagnostic_exchange_codes'
+        indexes = [
+            # Per-staff session analytics group and filter on these columns.
+            models.Index(fields=['staff_user', 'used', 'created_at'], name='diag_codes_staff_used_idx'),
+        ]
 
     def __str__(self):
         return f"ExchangeCode({self.code}) staff={self.staff_user_id} customer={self.customer_user_id}"
+
+
+class TokenGeneration(models.Model):
+    """
+    Per-user counter embedded in every JWT issued for that user.
+
+    Tokens carry the generation that was current when they were minted and
+    are rejected once it no longer matches.  Incrementing the counter
+    therefore revokes every outstanding token for the user ("log out
+    everywhere") without tracking individual JTIs.  Users without a row are
+    at generation 0.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='token_generation'
+    )
+    generation = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'token_generations'
+
+    def __str__(self):
+        return f"TokenGeneration(user={self.user_id}) gen={self.generation}"
@@ -0,0 +1,89 @@
+"""
+On-disk ring of per-request cProfile reports.
+
+``ProfilingMiddleware`` profiles sampled or staff-triggered requests and hands
+the finished profiler to ``save_report``.  Reports are ``pstats`` dumps named
+``<time_ns>-<ViewName>-<METHOD>-<duration ms>ms.prof`` in ``PROFILING_DIR``;
+only the newest ``PROFILING_MAX_REPORTS`` are kept.  Load one with
+``python -m pstats <file>`` or any pstats viewer (snakeviz, tuna).
+"""
+import io
+import os
+import pstats
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+REPORT_NAME_RE = re.compile(
+    r'^(?P<created_ns>\d+)-(?P<view>\w+)-(?P<method>[A-Z]+)-(?P<duration_ms>\d+)ms\.prof$'
+)
+
+
+def _report_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def save_report(profiler, view_name, method, duration):
+    """Write ``profiler``'s stats to the ring directory and evict the oldest reports."""
+    directory = _report_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'{time.time_ns()}-{view_name}-{method}-{round(duration * 1000)}ms.prof'
+
+    # Dump next to the target and rename, so listings never see partial files.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        profiler.dump_stats(tmp_path)
+        os.replace(tmp_path, directory / name)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    for stale in list_reports()[settings.PROFILING_MAX_REPORTS:]:
+        try:
+            os.unlink(directory / stale['name'])
+        except FileNotFoundError:  # evicted concurrently by another worker
+            pass
+    return name
+
+
+def list_reports(view=None):
+    """Return report metadata dicts, newest first, optionally for one view class."""
+    directory = _report_dir()
+    if not directory.is_dir():
+        return []
+
+    reports = []
+    for entry in os.scandir(directory):
+        match = REPORT_NAME_RE.match(entry.name)
+        if match is None or (view is not None and match['view'] != view):
+            continue
+        reports.append({
+            'name': entry.name,
+            'view': match['view'],
+            'method': match['method'],
+            'duration_ms': int(match['duration_ms']),
+            'created': int(match['created_ns']) / 1e9,
+            'size': entry.stat().st_size,
+        })
+    reports.sort(key=lambda report: report['name'], reverse=True)
+    return reports
+
+
+def report_path(name):
+    """Return the path of report ``name``, or ``None`` if it is not a stored report."""
+    if REPORT_NAME_RE.match(name) is None:
+        return None
+    path = _report_dir() / name
+    return path if path.is_file() else None
+
+
+def render_report(path, sort='cumulative', limit=50):
+    """Return the ``pstats`` text summary of a stored report."""
+    stream = io.StringIO()
+    stats = pstats.Stats(str(path), stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
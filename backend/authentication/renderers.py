@@ -0,0 +1,96 @@
+"""
+orjson-backed JSON renderer and parser for the auth API.
+
+DRF's ``JSONRenderer`` and ``JSONParser`` go through the standard-library
+``json`` module and a Python-level ``JSONEncoder.default`` hook.  orjson does
+the same work in native code and produces the same compact UTF-8 output,
+except for floats.  Very large and very small floats are written without
+the ``+`` and leading zeros of ``json``'s exponent (``1e16`` rather than
+``1e+16``, ``0.00001`` rather than ``1e-05``); the values are the same.
+NaN and infinities, which orjson would write as ``null``, are left to the
+stock renderer so they raise ``ValueError`` as before.
+
+orjson is listed in ``requirements.txt`` but stays optional: when it is not
+installed, or a request asks for something it does not cover (indented
+output, ASCII-only output, a non-UTF-8 request body, integers wider than 64
+bits), both classes defer to the stock DRF implementation.
+"""
+import math
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by patching in tests
+    orjson = None
+
+_UTF8_CHARSETS = {'utf-8', 'utf8'}
+
+
+def _has_non_finite_float(value):
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(map(_has_non_finite_float, value.values()))
+    if isinstance(value, (list, tuple)):
+        return any(map(_has_non_finite_float, value))
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes through orjson when it is available."""
+
+    # Datetimes, decimals, lazy strings etc. still go through DRF's encoder
+    # so they are formatted exactly as the stock renderer formats them.
+    _default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # orjson writes NaN and infinities as null; only look for them when
+        # the output has a null at all.
+        if b'null' in ret and _has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-JavaScript-subset escaping as the stock renderer.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """``JSONParser`` that decodes through orjson when it is available."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in _UTF8_CHARSETS:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
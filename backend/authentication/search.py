@@ -0,0 +1,272 @@
+"""
+Customer search for the intranet picker.
+
+Matches are ranked: exact username, username prefix, first name / last name /
+email prefix, then (with ``USER_SEARCH_SUBSTRING`` enabled, for queries of at
+least ``USER_SEARCH_SUBSTRING_MIN_LENGTH`` characters, and only if the prefix
+ranks did not fill the limit) substring anywhere in those fields.  Within a
+rank results are ordered by username.
+
+Every tier is bounded so typeahead stays fast on large tables.  Username
+matches are read in the order of the case-insensitive prefix index
+(migration ``0005``), so ``LIMIT`` stops the scan early.  Name and email
+matches are ranked by username among the first ``USER_SEARCH_MAX_CANDIDATES``
+matches of each field, in index order.  The substring tier is only
+index-backed on PostgreSQL (trigram indexes from migration ``0007``); on
+other databases it is a full table scan, which is why it is off by default.
+
+With ``USER_SEARCH_INDEX`` enabled the prefix ranks are served from an
+in-process sorted-array index instead.  The index is built in a background
+thread, and requests fall back to the database until it is ready.  It is
+kept current by ``User`` signals and rebuilt in the background every
+``USER_SEARCH_INDEX_MAX_AGE`` seconds so changes made by other worker
+processes are picked up.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q, TextField
+from django.db.models.functions import Cast, Collate, Upper
+
+from .serializers import USER_FIELDS as RESULT_FIELDS, user_values
+
+SEARCH_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+def _customers():
+    return User.objects.filter(is_staff=False, is_active=True)
+
+
+def _field_q(lookup, query, fields):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__{lookup}': query})
+    return condition
+
+
+def _index_order(field):
+    """Case-insensitive sort key the prefix index on ``field`` can return rows in."""
+    if connection.vendor == 'sqlite':
+        return Collate(field, 'NOCASE')
+    # Matches the UPPER(col::text) expression of istartswith and its indexes.
+    return Upper(Cast(field, output_field=TextField()))
+
+
+def _rows_by_username(candidates, limit):
+    """Result rows for the first ``limit`` of ``(username, id)`` candidates, by username."""
+    ids = [user_id for _, user_id in sorted(candidates)[:limit]]
+    if not ids:
+        return []
+    rows = {row['id']: row for row in user_values(User.objects.filter(id__in=ids))}
+    return [rows[user_id] for user_id in ids]
+
+
+def _candidates(queryset):
+    return list(queryset.values_list('username', 'id')[:settings.USER_SEARCH_MAX_CANDIDATES])
+
+
+def _db_prefix_search(query, limit):
+    # An exact username sorts first among its prefix matches, so this slice
+    # is already ranked exact, then username prefix, by username.
+    results = list(user_values(
+        _customers().filter(username__istartswith=query).order_by(_index_order('username'))
+    )[:limit])
+    if len(results) == limit:
+        return results
+
+    # Name/email tier: each field's first matches in index order, ranked by
+    # username here instead of sorting every match in the database.
+    candidates = set()
+    for field in SEARCH_FIELDS[1:]:
+        candidates.update(_candidates(
+            _customers()
+            .filter(**{f'{field}__istartswith': query})
+            .exclude(username__istartswith=query)
+            .order_by(_index_order(field))
+        ))
+    return results + _rows_by_username(candidates, limit - len(results))
+
+
+def _db_substring_search(query, limit, exclude_ids):
+    return _rows_by_username(_candidates(
+        _customers()
+        .filter(_field_q('icontains', query, SEARCH_FIELDS))
+        .exclude(_field_q('istartswith', query, SEARCH_FIELDS))
+        .exclude(id__in=exclude_ids)
+        .order_by()
+    ), limit)
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over the active customers' search fields.
+
+    ``entries`` keeps one sorted list of ``(lowercased value, user id)`` per
+    search field, so a prefix lookup is two ``bisect`` calls plus a slice and
+    the username slice is already in result order.  ``rows`` maps user IDs to
+    the result dicts returned by ``search``.
+
+    A build reads the table without holding ``lock``.  Signal updates that
+    arrive meanwhile are applied to the current arrays and also queued in
+    ``pending``, then replayed onto the new arrays before they are swapped
+    in, so a rebuild never loses them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {field: [] for field in SEARCH_FIELDS}
+        self.rows = {}
+        self.built_at = None
+        self.rebuilding = False
+        self.pending = None
+
+    def build(self):
+        with self.lock:
+            self.pending = []
+        try:
+            entries = {field: [] for field in SEARCH_FIELDS}
+            rows = {}
+            for row in user_values(_customers()).iterator(chunk_size=10000):
+                rows[row['id']] = row
+                for field, entry in self._entries_for(row):
+                    entries[field].append(entry)
+            for field_entries in entries.values():
+                field_entries.sort()
+            with self.lock:
+                self.entries, self.rows = entries, rows
+                for user_id, row in self.pending:
+                    self._remove(user_id)
+                    if row is not None:
+                        self._add(row)
+                self.built_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+
+    def ensure_fresh(self):
+        """Start a background build if the index is missing or stale; return whether it is usable."""
+        if self.is_stale():
+            with self.lock:
+                start, self.rebuilding = not self.rebuilding, True
+            if start:
+                threading.Thread(target=self._rebuild, daemon=True).start()
+        return self.is_built()
+
+    def _rebuild(self):
+        try:
+            self.build()
+        finally:
+            with self.lock:
+                self.rebuilding = False
+            connection.close()
+
+    def is_built(self):
+        return self.built_at is not None
+
+    def is_tracking(self):
+        """Whether signal updates matter: the index is built or being built."""
+        return self.built_at is not None or self.pending is not None
+
+    def is_stale(self):
+        return (
+            not self.is_built()
+            or time.monotonic() - self.built_at > settings.USER_SEARCH_INDEX_MAX_AGE
+        )
+
+    @staticmethod
+    def _entries_for(row):
+        return [(field, (row[field].lower(), row['id'])) for field in SEARCH_FIELDS if row[field]]
+
+    def update(self, user):
+        """Re-index one user after a save (or drop them if no longer a customer)."""
+        row = None
+        if user.is_active and not user.is_staff:
+            row = {field: getattr(user, field) for field in RESULT_FIELDS}
+        with self.lock:
+            self._remove(user.pk)
+            if row is not None:
+                self._add(row)
+            if self.pending is not None:
+                self.pending.append((user.pk, row))
+
+    def remove(self, user_id):
+        with self.lock:
+            self._remove(user_id)
+            if self.pending is not None:
+                self.pending.append((user_id, None))
+
+    def _add(self, row):
+        self.rows[row['id']] = row
+        for field, entry in self._entries_for(row):
+            insort(self.entries[field], entry)
+
+    def _remove(self, user_id):
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+        for field, entry in self._entries_for(row):
+            field_entries = self.entries[field]
+            index = bisect_left(field_entries, entry)
+            if index < len(field_entries) and field_entries[index] == entry:
+                del field_entries[index]
+
+    def _prefix_slice(self, field, prefix, count):
+        field_entries = self.entries[field]
+        start = bisect_left(field_entries, (prefix,))
+        end = bisect_left(field_entries, (prefix + '\uffff',), lo=start)
+        return field_entries[start:min(end, start + count)]
+
+    def search(self, query, limit):
+        prefix = query.lower()
+        with self.lock:
+            rows = self.rows
+            # An exact username sorts first among its prefix matches, so this
+            # slice is already ranked exact, then username prefix, by username.
+            matched = [user_id for _, user_id in self._prefix_slice('username', prefix, limit)]
+            if len(matched) < limit:
+                seen = set(matched)
+                others = {
+                    user_id
+                    for field in SEARCH_FIELDS[1:]
+                    for _, user_id in self._prefix_slice(field, prefix, settings.USER_SEARCH_MAX_CANDIDATES)
+                    if user_id not in seen
+                }
+                matched += sorted(others, key=lambda uid: rows[uid]['username'])[:limit - len(matched)]
+            return [rows[user_id] for user_id in matched]
+
+
+prefix_index = PrefixIndex()
+
+
+def search_customers(query, limit):
+    """Return up to ``limit`` ranked customer dicts (``RESULT_FIELDS``) matching ``query``."""
+    query = query.strip()
+    if not query:
+        return []
+
+    if settings.USER_SEARCH_INDEX and prefix_index.ensure_fresh():
+        results = prefix_index.search(query, limit)
+    else:
+        results = _db_prefix_search(query, limit)
+
+    if (
+        settings.USER_SEARCH_SUBSTRING
+        and len(results) < limit
+        and len(query) >= settings.USER_SEARCH_SUBSTRING_MIN_LENGTH
+    ):
+        results += _db_substring_search(query, limit - len(results), [r['id'] for r in results])
+    return results
+
+
+def reindex_user(sender, instance, **kwargs):
+    if prefix_index.is_tracking():
+        prefix_index.update(instance)
+
+
+def unindex_user(sender, instance, **kwargs):
+    if prefix_index.is_tracking():
+        prefix_index.remove(instance.pk)
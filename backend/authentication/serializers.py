@@ -1,11 +1,37 @@
+from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
 
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_staff')
+
+
+def user_values(queryset):
+    """
+    ``queryset`` as ``UserSerializer`` representations, without model instances.
+
+    Selects only ``USER_FIELDS`` and yields one dict per user, identical to
+    ``UserSerializer(user).data``; use ``list()`` or ``.get()`` on the result.
+    """
+    return queryset.values(*USER_FIELDS)
+
+
 class UserSerializer(serializers.ModelSerializer):
+    """
+    Read-only user representation.
+
+    Every field is a plain column that its DRF field would return unchanged,
+    so ``to_representation`` reads the attributes directly instead of
+    building and running a field object per column for every user.
+    """
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_staff']
+        fields = USER_FIELDS
+        read_only_fields = USER_FIELDS
+
+    def to_representation(self, instance):
+        return {field: getattr(instance, field) for field in USER_FIELDS}
 
 
 class LoginSerializer(serializers.Serializer):
@@ -15,3 +41,39 @@ class LoginSerializer(serializers.Serializer):
 
 class DiagnosticLoginSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
+
+
+class LogoutAllSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField(required=False)
+
+
+class BulkTokenSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.BULK_TOKEN_MAX_USERS,
+    )
+
+
+class IntrospectSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.INTROSPECT_MAX_TOKENS,
+    )
+
+
+class UserSearchSerializer(serializers.Serializer):
+    q = serializers.CharField()
+    limit = serializers.IntegerField(min_value=1, max_value=settings.USER_SEARCH_MAX_LIMIT, default=20)
+
+
+class BootstrapSerializer(serializers.Serializer):
+    customers = serializers.BooleanField(default=False)
+
+
+class DiagnosticSessionReportSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    staff_user = serializers.IntegerField(required=False)
+    detail = serializers.BooleanField(default=False)
@@ -0,0 +1,194 @@
+"""
+In-process soak test for memory growth in the auth hot path.
+
+``Soak`` runs the session cycle below over and over through Django's WSGI
+handler, in the calling thread and against the configured database:
+
+    customer: login -> me -> refresh -> logout
+    staff:    diagnostic-login -> (new tab) exchange -> diagnostic-info
+
+The staff session logs in once; every cycle uses a fresh customer client
+and a fresh tab.  After ``warmup`` cycles it samples the interpreter's live
+allocated blocks (``sys.getallocatedblocks``) and RSS every
+``sample_every`` cycles, fits a line through the samples and reports the
+growth per cycle.  Tracing every allocation would triple the cost of a
+cycle, so ``tracemalloc`` only runs during the sampled cycles: each step
+runs between two snapshots, and the lines that still hold new memory
+afterwards are summed as that step's top allocation sites.
+
+Requests go through ``WSGIHandler`` rather than ``django.test.Client``: the
+test client reconnects ``close_old_connections`` on every request, and each
+reconnect leaves a ``weakref.finalize`` behind, which would show up here as
+a leak of its own.
+"""
+import gc
+import json
+import os
+import secrets
+import sys
+import tracemalloc
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+API_PREFIX = '/api/auth'
+
+STEPS = (
+    'login', 'me', 'refresh', 'logout',
+    'diagnostic-login', 'exchange', 'diagnostic-info',
+)
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+
+def rss_bytes():
+    """Current resident set size from ``/proc/self/statm``, or ``None`` off Linux."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def growth_per_cycle(points):
+    """Least-squares slope of ``(cycle, value)`` points, in units per cycle."""
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+class SoakClient(RequestFactory):
+    """Cookie-keeping client that sends ``RequestFactory`` requests through ``handler``."""
+
+    def __init__(self, handler, **defaults):
+        super().__init__(**defaults)
+        self.handler = handler
+
+    def request(self, **request):
+        environ = super().request(**request).environ
+        response = self.handler(environ, lambda status, headers, exc_info=None: None)
+        try:
+            self.cookies.update(response.cookies)
+        finally:
+            response.close()
+        return response
+
+
+def _snapshot():
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+class Soak:
+    """Run soak cycles and collect memory samples, step errors and allocation sites."""
+
+    def __init__(self, fast_hasher=True):
+        self.fast_hasher = fast_hasher
+        self.samples = []  # (cycle, allocated blocks, rss bytes)
+        self.errors = Counter()
+        self.sites = defaultdict(Counter)  # step -> {site: bytes still held}
+
+    def run(self, cycles, warmup, sample_every):
+        hashers = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        if self.fast_hasher:
+            hashers.enable()
+        password = secrets.token_urlsafe(16)
+        suffix = secrets.token_hex(4)
+        customer = User.objects.create_user(username=f'soak-customer-{suffix}', password=password)
+        staff = User.objects.create_user(username=f'soak-staff-{suffix}', password=password, is_staff=True)
+        self.credentials = {'customer': (customer.username, password), 'staff': (staff.username, password)}
+        self.customer_id = customer.pk
+        self.handler = WSGIHandler()
+
+        try:
+            self.staff = SoakClient(self.handler)
+            if self._request(self.staff, 'staff login', 'POST', '/login/?require_staff=true',
+                             self._login_body('staff')) is None:
+                raise RuntimeError('Staff login failed.')
+            for cycle in range(1, cycles + 1):
+                sampled = cycle > warmup and (cycle - warmup) % sample_every == 0
+                if sampled:
+                    tracemalloc.start()
+                    try:
+                        self._cycle(profile=True)
+                    finally:
+                        tracemalloc.stop()
+                    gc.collect()
+                    self.samples.append((cycle, sys.getallocatedblocks(), rss_bytes()))
+                else:
+                    self._cycle(profile=False)
+        finally:
+            User.objects.filter(pk__in=[customer.pk, staff.pk]).delete()
+            if self.fast_hasher:
+                hashers.disable()
+        return self
+
+    def _login_body(self, role):
+        username, password = self.credentials[role]
+        return {'username': username, 'password': password}
+
+    def _cycle(self, profile):
+        customer = SoakClient(self.handler)
+        tab = SoakClient(self.handler)
+        steps = (
+            (customer, 'login', 'POST', '/login/', self._login_body('customer')),
+            (customer, 'me', 'GET', '/me/', None),
+            (customer, 'refresh', 'POST', '/refresh/', None),
+            (customer, 'logout', 'POST', '/logout/', None),
+            (self.staff, 'diagnostic-login', 'POST', '/diagnostic-login/', {'customer_id': self.customer_id}),
+            (tab, 'exchange', 'POST', '/exchange/', None),
+            (tab, 'diagnostic-info', 'GET', '/diagnostic-info/', None),
+        )
+        code = None
+        for client, step, method, path, body in steps:
+            if step == 'exchange':
+                if code is None:
+                    continue
+                body = {'code': code}
+            if profile:
+                before = _snapshot()
+            data = self._request(client, step, method, path, body)
+            if profile:
+                self._record_sites(step, before, _snapshot())
+            if step == 'diagnostic-login' and data:
+                code = data.get('code')
+
+    def _request(self, client, step, method, path, body):
+        kwargs = {}
+        if body is not None:
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'}
+        response = getattr(client, method.lower())(API_PREFIX + path, **kwargs)
+        if response.status_code != 200:
+            self.errors[step] += 1
+            return None
+        return json.loads(response.content)
+
+    def _record_sites(self, step, before, after):
+        for stat in after.compare_to(before, 'lineno'):
+            if stat.size_diff > 0:
+                frame = stat.traceback[0]
+                self.sites[step][f'{frame.filename}:{frame.lineno}'] += stat.size_diff
+
+    def growth(self):
+        """Return ``(allocated blocks, rss bytes)`` growth per cycle over the samples."""
+        return (
+            growth_per_cycle([(cycle, blocks) for cycle, blocks, _ in self.samples]),
+            growth_per_cycle([(cycle, rss) for cycle, _, rss in self.samples]),
+        )
+
+    def top_sites(self, limit):
+        """Return ``{step: [(site, bytes), ...]}`` with the ``limit`` largest sites per step."""
+        return {step: self.sites[step].most_common(limit) for step in STEPS if self.sites[step]}
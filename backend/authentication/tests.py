@@ -1,6 +1,7 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, modify_settings, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
+import io
 import json
 
 
@@ -74,6 +75,111 @@ class MeViewTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()['username'], 'testuser')
 
+    def test_me_rejects_user_deactivated_after_login(self):
+        self._login()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        resp = self.client.get(reverse('auth-me'))
+        self.assertEqual(resp.status_code, 401)
+
+
+class BootstrapViewTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        # Generations are cached by user ID, which the test database reuses.
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='pass')
+
+    def _login(self, client, username):
+        client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': username, 'password': 'pass'}),
+            content_type='application/json',
+        )
+
+    def test_customer_session(self):
+        from django.conf import settings
+        self._login(self.client, 'customer')
+        resp = self.client.get(reverse('auth-bootstrap'), {'customers': 'true'})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['user'], self.client.get(reverse('auth-me')).json())
+        self.assertIsNone(data['staff'])
+        self.assertFalse(data['diagnostic'])
+        self.assertNotIn('customers', data)
+        lifetime = settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()
+        self.assertTrue(lifetime - 5 <= data['access_expires_in'] <= lifetime)
+
+    def test_staff_gets_customer_list_on_request(self):
+        self._login(self.client, 'staff')
+        data = self.client.get(reverse('auth-bootstrap'), {'customers': 'true'}).json()
+        self.assertEqual(data['user']['username'], 'staff')
+        self.assertEqual(data['customers'], self.client.get(reverse('auth-users')).json())
+        self.assertNotIn('customers', self.client.get(reverse('auth-bootstrap')).json())
+
+    def test_diagnostic_session_includes_staff(self):
+        from django.test import Client
+        self._login(self.client, 'staff')
+        code = self.client.post(
+            reverse('auth-diagnostic-login'),
+            data=json.dumps({'customer_id': self.customer.id}),
+            content_type='application/json',
+        ).json()['code']
+        tab = Client()
+        tab.post(reverse('auth-exchange'), data=json.dumps({'code': code}), content_type='application/json')
+
+        data = tab.get(reverse('auth-bootstrap')).json()
+        self.assertEqual((data['user']['username'], data['staff']['username']), ('customer', 'staff'))
+        self.assertTrue(data['diagnostic'])
+
+        self.client.post(reverse('auth-logout-all'))
+        data = tab.get(reverse('auth-bootstrap')).json()
+        self.assertEqual(data['user']['username'], 'customer')
+        self.assertIsNone(data['staff'])
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(reverse('auth-bootstrap')).status_code, 401)
+
+
+class LazyUserTests(TestCase):
+    def setUp(self):
+        from .utils import get_tokens_for_user
+        self.user = User.objects.create_user(username='lazy', password='pass', email='lazy@example.com')
+        self.access = get_tokens_for_user(self.user)['access']
+
+    def _authenticate(self):
+        from django.test import RequestFactory
+        from .backends import CookieJWTAuthentication
+
+        request = RequestFactory().get('/')
+        request.COOKIES['access_token'] = self.access
+        return CookieJWTAuthentication().authenticate(request)[0]
+
+    def test_pk_and_auth_flags_need_no_query(self):
+        user = self._authenticate()
+        with self.assertNumQueries(0):
+            self.assertTrue(user)
+            self.assertTrue(user.is_authenticated)
+            self.assertFalse(user.is_anonymous)
+            self.assertEqual((user.pk, user.id), (self.user.pk, self.user.pk))
+
+    def test_other_attributes_load_the_user_once(self):
+        user = self._authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'lazy@example.com')
+            self.assertEqual(user.username, 'lazy')
+        self.assertEqual(user, self.user)
+        self.assertIsInstance(user, User)
+
+    def test_inactive_user_fails_on_first_load(self):
+        from rest_framework.exceptions import AuthenticationFailed
+
+        user = self._authenticate()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            user.username
+
 
 class UserListViewTests(TestCase):
     def setUp(self):
@@ -105,6 +211,19 @@ class UserListViewTests(TestCase):
         self.assertIn('customer', usernames)
         self.assertNotIn('staff', usernames)
 
+    def test_list_matches_serializer_and_skips_unexposed_columns(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .serializers import UserSerializer
+
+        User.objects.create_user(username='zoe', password='pass', first_name='Zoë', email='zoe@example.com')
+        self._login_as('staff')
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('auth-users'))
+        customers = User.objects.filter(is_staff=False).order_by('username')
+        self.assertEqual(resp.json(), json.loads(json.dumps(UserSerializer(customers, many=True).data)))
+        self.assertNotIn('password', queries.captured_queries[-1]['sql'])
+
 
 class DiagnosticLoginTests(TestCase):
     def setUp(self):
@@ -201,6 +320,53 @@ class DiagnosticLoginTests(TestCase):
                 msg=f"{cookie_name} should be a session cookie (no max-age), got {max_age!r}",
             )
 
+    def test_exchange_mints_tokens_for_both_users(self):
+        from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+        self._login_as_staff()
+        diag_resp = self.client.post(
+            reverse('auth-diagnostic-login'),
+            data=json.dumps({'customer_id': self.customer.id}),
+            content_type='application/json',
+        )
+        code = diag_resp.json()['code']
+
+        from django.test import Client
+        exchange_resp = Client().post(
+            reverse('auth-exchange'),
+            data=json.dumps({'code': code}),
+            content_type='application/json',
+        )
+        cookies = exchange_resp.cookies
+        self.assertEqual(AccessToken(cookies['access_token'].value)['user_id'], self.customer.id)
+        self.assertEqual(RefreshToken(cookies['refresh_token'].value)['user_id'], self.customer.id)
+        self.assertEqual(AccessToken(cookies['staff_access_token'].value)['user_id'], self.staff.id)
+
+    def test_exchange_requires_both_users_to_still_qualify(self):
+        from django.test import Client
+        self._login_as_staff()
+        for user, field, value in (
+            (self.customer, 'is_active', False),
+            (self.staff, 'is_active', False),
+            (self.staff, 'is_staff', False),
+        ):
+            with self.subTest(user=user.username, field=field):
+                code = self.client.post(
+                    reverse('auth-diagnostic-login'),
+                    data=json.dumps({'customer_id': self.customer.id}),
+                    content_type='application/json',
+                ).json()['code']
+                User.objects.filter(pk=user.pk).update(**{field: value})
+                try:
+                    resp = Client().post(
+                        reverse('auth-exchange'),
+                        data=json.dumps({'code': code}),
+                        content_type='application/json',
+                    )
+                finally:
+                    User.objects.filter(pk=user.pk).update(**{field: not value})
+                self.assertEqual(resp.status_code, 400)
+                self.assertNotIn('access_token', resp.cookies)
+
     def test_exchange_code_is_single_use(self):
         self._login_as_staff()
         diag_resp = self.client.post(
@@ -337,3 +503,1212 @@ class LogoutViewTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         # After logout the access_token cookie should have max_age=0 (cleared)
         self.assertEqual(resp.cookies['access_token']['max-age'], 0)
+
+
+class BulkTokenTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True
+        )
+        self.customers = [
+            User.objects.create_user(username=f'customer{i}', password='pass')
+            for i in range(3)
+        ]
+        self.inactive = User.objects.create_user(
+            username='inactive', password='pass', is_active=False
+        )
+
+    def _login_as(self, username):
+        self.client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': username, 'password': 'pass'}),
+            content_type='application/json',
+        )
+
+    def test_minted_tokens_match_simplejwt_claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+        from .minting import mint_tokens_bulk
+
+        result = mint_tokens_bulk([c.id for c in self.customers] + [self.inactive.id, 99999])
+        self.assertEqual(result['count'], 6)
+        self.assertEqual(sorted(result['missing']), sorted([self.inactive.id, 99999]))
+        for pair in result['tokens']:
+            access = AccessToken(pair['access'])
+            refresh = RefreshToken(pair['refresh'])
+            self.assertEqual(access['user_id'], pair['user_id'])
+            self.assertEqual(refresh['user_id'], pair['user_id'])
+            self.assertNotEqual(access['jti'], refresh['jti'])
+
+    def test_minted_access_token_authenticates(self):
+        from django.test import Client
+        from .minting import mint_tokens_bulk
+
+        pair = mint_tokens_bulk([self.customers[0].id])['tokens'][0]
+        client = Client()
+        client.cookies['access_token'] = pair['access']
+        resp = client.get(reverse('auth-me'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['username'], 'customer0')
+
+    def test_bulk_endpoint_is_staff_only(self):
+        self._login_as('customer0')
+        resp = self.client.post(
+            reverse('auth-tokens-bulk'),
+            data=json.dumps({'user_ids': [self.customers[1].id]}),
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 403)
+
+    def test_staff_targets_require_superuser(self):
+        superuser = User.objects.create_superuser(username='root', password='pass')
+        self._login_as('staff')
+        resp = self.client.post(
+            reverse('auth-tokens-bulk'),
+            data=json.dumps({'user_ids': [superuser.id, self.staff.id, self.customers[0].id]}),
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([pair['user_id'] for pair in resp.json()['tokens']], [self.customers[0].id])
+        self.assertEqual(sorted(resp.json()['missing']), sorted([superuser.id, self.staff.id]))
+
+        self._login_as('root')
+        resp = self.client.post(
+            reverse('auth-tokens-bulk'),
+            data=json.dumps({'user_ids': [self.staff.id]}),
+            content_type='application/json',
+        )
+        self.assertEqual([pair['user_id'] for pair in resp.json()['tokens']], [self.staff.id])
+
+    def test_bulk_mint_is_audited(self):
+        import tempfile
+        from . import events
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/events.log'
+        events.start(path, queue_size=100)
+        self.addCleanup(events.stop)
+
+        self._login_as('staff')
+        self.client.post(
+            reverse('auth-tokens-bulk'),
+            data=json.dumps({'user_ids': [self.customers[0].id, 99999]}),
+            content_type='application/json',
+        )
+        events.stop()
+        with open(path, encoding='utf-8') as f:
+            logged = [json.loads(line) for line in f]
+        minted = [e for e in logged if e['event'] == 'tokens_minted']
+        self.assertEqual(len(minted), 1)
+        self.assertEqual(
+            (minted[0]['by_user_id'], minted[0]['user_ids'], minted[0]['missing']),
+            (self.staff.id, [self.customers[0].id], 1),
+        )
+
+    def test_bulk_endpoint_reports_throughput(self):
+        self._login_as('staff')
+        resp = self.client.post(
+            reverse('auth-tokens-bulk'),
+            data=json.dumps({'user_ids': [c.id for c in self.customers]}),
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(len(data['tokens']), 3)
+        self.assertEqual(data['count'], 6)
+        self.assertIn('tokens_per_second', data)
+
+
+class FastCodecTests(TestCase):
+    def setUp(self):
+        from .codec import build_token_backend
+        self.stock = build_token_backend(fast=False)
+        self.fast = build_token_backend(fast=True)
+        self.payload = {'token_type': 'access', 'exp': 4102444800, 'jti': 'abc', 'user_id': 7}
+
+    def test_encode_is_byte_compatible_with_pyjwt(self):
+        self.assertEqual(self.fast.encode(self.payload), self.stock.encode(self.payload))
+
+    def test_decode_round_trip(self):
+        self.assertEqual(self.fast.decode(self.stock.encode(self.payload)), self.payload)
+
+    def test_decode_rejects_tampered_and_expired_tokens(self):
+        from rest_framework_simplejwt.exceptions import TokenBackendError
+
+        header, payload, signature = self.fast.encode(self.payload).split('.')
+        tampered = '.'.join([header, payload, signature[:-2] + ('AA' if signature[-2:] != 'AA' else 'BB')])
+        expired = self.fast.encode(dict(self.payload, exp=1000))
+        for token in (tampered, expired, 'not-a-token'):
+            with self.assertRaises(TokenBackendError):
+                self.fast.decode(token)
+
+    def test_decode_outcomes_match_pyjwt(self):
+        import base64
+        import hashlib
+        import hmac
+        import time
+        from rest_framework_simplejwt.settings import api_settings
+
+        key = api_settings.SIGNING_KEY.encode('utf-8')
+
+        def b64(data):
+            return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+        def signed(payload_json, header='{"alg":"HS256","typ":"JWT"}', signing_key=key):
+            signing_input = b64(header.encode()) + '.' + b64(payload_json.encode())
+            digest = hmac.new(signing_key, signing_input.encode(), hashlib.sha256).digest()
+            return signing_input + '.' + b64(digest)
+
+        now = int(time.time())
+        valid = self.stock.encode(self.payload)
+        header, payload, signature = valid.split('.')
+        other = self.stock.encode(dict(self.payload, user_id=8)).split('.')[1]
+        tokens = {
+            'valid': valid,
+            'expired': self.stock.encode(dict(self.payload, exp=now - 60)),
+            'future nbf': self.stock.encode(dict(self.payload, nbf=now + 3600)),
+            'future iat': self.stock.encode(dict(self.payload, iat=now + 3600)),
+            'exp not an integer': signed('{"exp":"soon","jti":"a"}'),
+            'exp infinite': signed('{"exp":Infinity,"jti":"a"}'),
+            'iat not an integer': signed('{"iat":[],"jti":"a"}'),
+            'nbf not an integer': signed('{"nbf":"later","jti":"a"}'),
+            'sub not a string': signed('{"sub":7,"jti":"a"}'),
+            'jti not a string': signed('{"jti":7}'),
+            'payload not an object': signed('[1,2]'),
+            'payload not json': signed('{"exp":'),
+            'swapped payload': '.'.join([header, other, signature]),
+            'tampered signature': '.'.join([header, payload, signature[:-2] + ('AA' if signature[-2:] != 'AA' else 'BB')]),
+            'wrong key': signed('{"jti":"a"}', signing_key=b'not-the-key'),
+            'HS512 header': signed('{"jti":"a"}', header='{"alg":"HS512","typ":"JWT"}'),
+            'none algorithm': b64(b'{"alg":"none","typ":"JWT"}') + '.' + payload + '.',
+            'junk in signature': '.'.join([header, payload, signature[:10] + '!!' + signature[10:]]),
+            'junk in payload': '.'.join([header, payload[:10] + '*' + payload[10:], signature]),
+            'over-padded signature': '.'.join([header, payload, signature + '===']),
+            'two segments': header + '.' + payload,
+            'four segments': '.'.join([header, payload, payload, signature]),
+            'garbage': 'not-a-token',
+            'empty': '',
+        }
+
+        def outcome(backend, token, verify):
+            try:
+                return backend.decode(token, verify=verify)
+            except Exception as e:
+                return type(e), str(e)
+
+        for name, token in tokens.items():
+            for verify in (True, False):
+                with self.subTest(name, verify=verify):
+                    self.assertEqual(outcome(self.fast, token, verify), outcome(self.stock, token, verify))
+
+    def test_codec_errors_match_pyjwt(self):
+        import jwt
+        from rest_framework_simplejwt.settings import api_settings
+        from .codec import HS256Codec
+
+        codec = HS256Codec(api_settings.SIGNING_KEY)
+        header, payload, signature = codec.encode(self.payload).split('.')
+        for token in (
+            codec.encode(dict(self.payload, exp=1000)),
+            codec.encode(dict(self.payload, iat='x')),
+            codec.encode(dict(self.payload, sub=1)),
+            '.'.join([header, payload, signature + '!']),
+            '.'.join([header, payload[1:], signature]),
+            header + '.' + payload,
+        ):
+            with self.subTest(token=token):
+                with self.assertRaises(jwt.InvalidTokenError) as fast:
+                    codec.decode(token)
+                with self.assertRaises(jwt.InvalidTokenError) as stock:
+                    jwt.decode(token, api_settings.SIGNING_KEY, algorithms=['HS256'])
+                self.assertEqual((type(fast.exception), str(fast.exception)),
+                                 (type(stock.exception), str(stock.exception)))
+
+    def test_foreign_header_falls_back_to_pyjwt(self):
+        import jwt
+        from rest_framework_simplejwt.settings import api_settings
+
+        token = jwt.encode(self.payload, api_settings.SIGNING_KEY, algorithm='HS256', headers={'kid': '1'})
+        self.assertEqual(self.fast.decode(token), self.payload)
+
+
+class IntrospectViewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True
+        )
+        self.customer = User.objects.create_user(
+            username='customer', password='pass', is_staff=False
+        )
+        self.inactive = User.objects.create_user(
+            username='inactive', password='pass', is_active=False
+        )
+
+    def _introspect(self, tokens, **extra):
+        return self.client.post(
+            reverse('auth-introspect'),
+            data=json.dumps({'tokens': tokens}),
+            content_type='application/json',
+            **extra
+        )
+
+    def test_batch_results_in_order_with_single_user_query(self):
+        from .utils import get_tokens_for_user
+
+        customer_access = get_tokens_for_user(self.customer)['access']
+        staff_tokens = get_tokens_for_user(self.staff)
+        tokens = [
+            customer_access,
+            'garbage',
+            staff_tokens['refresh'],  # wrong token type
+            get_tokens_for_user(self.inactive)['access'],
+            staff_tokens['access'],
+        ]
+        self.client.cookies['access_token'] = staff_tokens['access']
+        # One query authenticates the caller, one resolves the whole batch.
+        with self.assertNumQueries(2):
+            resp = self._introspect(tokens)
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()['results']
+        self.assertEqual([r['active'] for r in results], [True, False, False, False, True])
+        self.assertEqual(results[0]['user_id'], self.customer.id)
+        self.assertFalse(results[0]['is_staff'])
+        self.assertTrue(results[4]['is_staff'])
+        self.assertIn('exp', results[0])
+
+    def test_service_account_can_use_bearer_header(self):
+        from .utils import get_tokens_for_user
+
+        staff_access = get_tokens_for_user(self.staff)['access']
+        resp = self._introspect(
+            [get_tokens_for_user(self.customer)['access']],
+            HTTP_AUTHORIZATION=f'Bearer {staff_access}',
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.json()['results'][0]['active'])
+
+    def test_revoked_bearer_token_is_rejected(self):
+        from .utils import bump_token_generation, get_tokens_for_user
+
+        staff_access = get_tokens_for_user(self.staff)['access']
+        bump_token_generation(self.staff.id)
+        resp = self._introspect(
+            [get_tokens_for_user(self.customer)['access']],
+            HTTP_AUTHORIZATION=f'Bearer {staff_access}',
+        )
+        self.assertEqual(resp.status_code, 401)
+
+    def test_customer_cannot_introspect(self):
+        from .utils import get_tokens_for_user
+
+        self.client.cookies['access_token'] = get_tokens_for_user(self.customer)['access']
+        resp = self._introspect(['x'])
+        self.assertEqual(resp.status_code, 403)
+
+
+class LogoutAllViewTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        # Generations are cached by user ID, which the test database reuses.
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True
+        )
+        self.user = User.objects.create_user(username='user', password='pass')
+
+    def _client_logged_in_as(self, username):
+        from django.test import Client
+        client = Client()
+        client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': username, 'password': 'pass'}),
+            content_type='application/json',
+        )
+        return client
+
+    def test_tokens_carry_generation_claim(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .utils import get_tokens_for_user
+
+        token = AccessToken(get_tokens_for_user(self.user)['access'])
+        self.assertEqual(token['gen'], 0)
+
+    def test_logout_all_revokes_every_session(self):
+        laptop = self._client_logged_in_as('user')
+        phone = self._client_logged_in_as('user')
+
+        resp = laptop.post(reverse('auth-logout-all'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.cookies['access_token']['max-age'], 0)
+
+        self.assertEqual(phone.get(reverse('auth-me')).status_code, 401)
+        self.assertEqual(phone.post(reverse('auth-refresh')).status_code, 401)
+
+        # A fresh login picks up the new generation.
+        fresh = self._client_logged_in_as('user')
+        self.assertEqual(fresh.get(reverse('auth-me')).status_code, 200)
+
+    def test_bump_in_another_worker_does_not_break_fresh_logins(self):
+        from django.core.cache import cache
+        from .utils import _generation_cache_key, bump_token_generation
+
+        old = self._client_logged_in_as('user')
+        bump_token_generation(self.user.id)
+        # This worker's cache has not seen the bump, as when it ran elsewhere.
+        cache.set(_generation_cache_key(self.user.id), 0)
+
+        fresh = self._client_logged_in_as('user')
+        self.assertEqual(fresh.get(reverse('auth-me')).status_code, 200)
+        self.assertEqual(cache.get(_generation_cache_key(self.user.id)), 1)
+        self.assertEqual(old.get(reverse('auth-me')).status_code, 401)
+
+    def test_staff_can_revoke_another_user(self):
+        customer = self._client_logged_in_as('user')
+        staff = self._client_logged_in_as('staff')
+
+        resp = staff.post(
+            reverse('auth-logout-all'),
+            data=json.dumps({'user_id': self.user.id}),
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('access_token', resp.cookies)
+        self.assertEqual(customer.get(reverse('auth-me')).status_code, 401)
+        self.assertEqual(staff.get(reverse('auth-me')).status_code, 200)
+
+    def test_customer_cannot_revoke_another_user(self):
+        customer = self._client_logged_in_as('user')
+        resp = customer.post(
+            reverse('auth-logout-all'),
+            data=json.dumps({'user_id': self.staff.id}),
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 403)
+
+    def test_revoked_tokens_are_inactive_in_introspection(self):
+        from .utils import bump_token_generation, get_tokens_for_user
+
+        access = get_tokens_for_user(self.user)['access']
+        bump_token_generation(self.user.id)
+        staff = self._client_logged_in_as('staff')
+        resp = staff.post(
+            reverse('auth-introspect'),
+            data=json.dumps({'tokens': [access]}),
+            content_type='application/json',
+        )
+        self.assertFalse(resp.json()['results'][0]['active'])
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_database_suites_need_opt_in(self):
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with self.assertRaisesMessage(CommandError, '--with-db'):
+            call_command('benchmark', 'search', stdout=StringIO())
+
+        suites = {name: mock.Mock(return_value=[]) for name in ('codec', 'search')}
+        with mock.patch('authentication.management.commands.benchmark.SUITES', suites), \
+                mock.patch('authentication.management.commands.benchmark.DATABASE_SUITES', ('search',)):
+            call_command('benchmark', stdout=StringIO())
+        suites['codec'].assert_called_once_with()
+        suites['search'].assert_not_called()
+
+
+class LoadgenCommandTests(TransactionTestCase):
+    def test_reports_every_step_of_both_flows(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('loadgen', users=2, concurrency=1, refreshes=2, stdout=out, stderr=StringIO())
+        output = out.getvalue()
+        for step in ('customer login', 'customer refresh', 'customer logout',
+                     'intranet users', 'intranet exchange', 'intranet diagnostic-info'):
+            self.assertIn(step, output)
+        self.assertNotIn('100.0%', output)
+
+    def test_every_virtual_user_has_its_own_account(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('loadgen', users=6, concurrency=2, stdout=out, stderr=StringIO())
+        self.assertEqual(
+            set(User.objects.filter(username__startswith='loadgen-').values_list('username', 'is_staff')),
+            {(f'loadgen-customer-{i}', False) for i in (0, 2, 4)}
+            | {(f'loadgen-intranet-{i}', True) for i in (1, 3, 5)},
+        )
+        logins = [line for line in out.getvalue().splitlines() if line.split()[1:2] == ['login']]
+        self.assertEqual(len(logins), 2)
+        for line in logins:
+            self.assertIn(' 0.0%', line)
+        # A second run reuses the accounts.
+        err = StringIO()
+        call_command('loadgen', users=6, concurrency=2, stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue(), '')
+
+    def test_concurrent_in_process_run_has_no_lock_errors(self):
+        import logging
+        from io import StringIO
+        from django.core.management import call_command
+        from django.db import connection
+
+        out = StringIO()
+        User.objects.create_user(username='customer', password='pass')
+        options = connection.settings_dict.get('OPTIONS')
+        call_command('loadgen', users=20, concurrency=10, flow='intranet', stdout=out, stderr=StringIO())
+        self.assertNotIn('database is locked', out.getvalue())
+        for line in out.getvalue().splitlines():
+            if line.strip().startswith('intranet'):
+                self.assertIn(' 0.0%', line)
+        # The run's SQLite timeout and muted error log do not outlive it.
+        self.assertIs(connection.settings_dict.get('OPTIONS'), options)
+        self.assertNotIn('timeout', connection.settings_dict.get('OPTIONS') or {})
+        self.assertFalse(logging.getLogger('django.request').disabled)
+
+
+class SoakCommandTests(TransactionTestCase):
+    def soak(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('soak', cycles=40, warmup=10, sample_every=5, max_rss_growth=1e9, stdout=out, **options)
+        return out.getvalue()
+
+    def test_reports_samples_and_removes_its_users(self):
+        output = self.soak(max_growth=1e9)
+        self.assertIn('No memory growth detected.', output)
+        for step in ('login', 'refresh', 'diagnostic-login', 'exchange', 'diagnostic-info'):
+            self.assertIn(f'  {step}\n', output)
+        self.assertFalse(User.objects.filter(username__startswith='soak-').exists())
+
+    def test_fails_on_per_request_leak(self):
+        from unittest import mock
+        from django.core.management.base import CommandError
+        import authentication.views
+
+        leaked = []
+        user_values = authentication.views.user_values
+
+        def leaky_user_values(queryset):
+            leaked.extend(object() for _ in range(50))
+            return user_values(queryset)
+
+        with mock.patch.object(authentication.views, 'user_values', leaky_user_values):
+            with self.assertRaisesMessage(CommandError, 'live allocations grow'):
+                self.soak()
+
+
+@modify_settings(MIDDLEWARE={'append': 'authentication.middleware.TrustedOriginMiddleware'})
+class TrustedOriginMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': 'user', 'password': 'pass'}),
+            content_type='application/json',
+        )
+
+    def test_cross_site_post_with_cookies_is_rejected(self):
+        resp = self.client.post(reverse('auth-logout'), HTTP_ORIGIN='https://evil.example')
+        self.assertEqual(resp.status_code, 403)
+
+    def test_trusted_and_same_origin_posts_are_allowed(self):
+        for origin in ('http://localhost:3002', 'http://testserver'):
+            resp = self.client.post(reverse('auth-refresh'), HTTP_ORIGIN=origin)
+            self.assertEqual(resp.status_code, 200, msg=origin)
+
+    def test_requests_without_cookies_or_origin_are_allowed(self):
+        from django.test import Client
+        resp = Client().post(
+            reverse('auth-login'),
+            data=json.dumps({'username': 'user', 'password': 'pass'}),
+            content_type='application/json',
+            HTTP_ORIGIN='https://evil.example',
+        )
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.post(reverse('auth-refresh'))
+        self.assertEqual(resp.status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PerformanceBudgetTests(TestCase):
+    """
+    Query-count and wall-clock budgets for every auth endpoint.
+
+    A change that adds a query to the hot path (e.g. in
+    ``CookieJWTAuthentication``) or an N+1 in a view fails here.  Budgets
+    assume the caller's token generation is cached, as in steady state;
+    users seen for the first time (login, exchange) may add one lookup.
+    Wall-clock budgets are generous ceilings meant to catch order-of-magnitude
+    regressions, not to benchmark; the fast password hasher keeps login from
+    dominating them.
+    """
+
+    # endpoint: (max queries, max milliseconds). Inside TestCase every
+    # atomic block adds a SAVEPOINT/RELEASE pair to the count.
+    BUDGETS = {
+        'login': (2, 250),
+        'logout': (0, 100),
+        'logout-all': (4, 150),
+        'refresh': (0, 100),
+        'me': (1, 100),
+        'bootstrap': (1, 100),
+        'bootstrap-customers': (2, 150),
+        'users': (2, 150),
+        'diagnostic-login': (3, 150),
+        'exchange': (5, 150),
+        'diagnostic-info': (1, 100),
+        'tokens-bulk': (2, 250),
+        'introspect': (2, 150),
+    }
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True
+        )
+        self.customers = [
+            User.objects.create_user(username=f'customer{i}', password='pass')
+            for i in range(20)
+        ]
+
+    def _client_logged_in_as(self, username):
+        from django.test import Client
+        client = Client()
+        client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': username, 'password': 'pass'}),
+            content_type='application/json',
+        )
+        return client
+
+    def _assert_within_budget(self, endpoint, request):
+        import time
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        max_queries, max_ms = self.BUDGETS[endpoint]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            resp = request()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.assertLess(resp.status_code, 400, msg=f'{endpoint}: {resp.content!r}')
+        self.assertLessEqual(
+            len(queries), max_queries,
+            msg=f'{endpoint} ran {len(queries)} queries (budget {max_queries}):\n'
+                + '\n'.join(q['sql'] for q in queries.captured_queries),
+        )
+        self.assertLessEqual(
+            elapsed_ms, max_ms,
+            msg=f'{endpoint} took {elapsed_ms:.1f} ms (budget {max_ms} ms)',
+        )
+        return resp
+
+    def _post(self, client, name, body=None):
+        kwargs = {}
+        if body is not None:
+            kwargs = {'data': json.dumps(body), 'content_type': 'application/json'}
+        return client.post(reverse(f'auth-{name}'), **kwargs)
+
+    def test_login(self):
+        from django.test import Client
+        self._assert_within_budget('login', lambda: self._post(
+            Client(), 'login', {'username': 'customer0', 'password': 'pass'}
+        ))
+
+    def test_customer_session_endpoints(self):
+        client = self._client_logged_in_as('customer0')
+        self._assert_within_budget('me', lambda: client.get(reverse('auth-me')))
+        self._assert_within_budget('bootstrap', lambda: client.get(reverse('auth-bootstrap')))
+        self._assert_within_budget('refresh', lambda: self._post(client, 'refresh'))
+        self._assert_within_budget('logout', lambda: self._post(client, 'logout'))
+
+    def test_logout_all(self):
+        client = self._client_logged_in_as('customer0')
+        self._assert_within_budget('logout-all', lambda: self._post(client, 'logout-all'))
+
+    def test_staff_endpoints(self):
+        staff = self._client_logged_in_as('staff')
+        self._assert_within_budget('users', lambda: staff.get(reverse('auth-users')))
+        self._assert_within_budget('bootstrap-customers', lambda: staff.get(
+            reverse('auth-bootstrap'), {'customers': 'true'}
+        ))
+        self._assert_within_budget('tokens-bulk', lambda: self._post(
+            staff, 'tokens-bulk', {'user_ids': [c.id for c in self.customers]}
+        ))
+        from .utils import get_tokens_for_user
+        tokens = [get_tokens_for_user(c)['access'] for c in self.customers]
+        self._assert_within_budget('introspect', lambda: self._post(
+            staff, 'introspect', {'tokens': tokens}
+        ))
+
+    def test_diagnostic_flow(self):
+        from django.test import Client
+        staff = self._client_logged_in_as('staff')
+        resp = self._assert_within_budget('diagnostic-login', lambda: self._post(
+            staff, 'diagnostic-login', {'customer_id': self.customers[0].id}
+        ))
+        tab = Client()
+        code = resp.json()['code']
+        self._assert_within_budget('exchange', lambda: self._post(tab, 'exchange', {'code': code}))
+        self._assert_within_budget('diagnostic-info', lambda: tab.get(reverse('auth-diagnostic-info')))
+        self._assert_within_budget('bootstrap', lambda: tab.get(reverse('auth-bootstrap')))
+
+
+class UserSearchViewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username='staff', password='pass', is_staff=True
+        )
+        for username, first, last, email in [
+            ('anna', 'Anna', 'Nowak', 'anna@example.com'),
+            ('annabelle', 'Belle', 'Kowalska', 'belle@example.com'),
+            ('bob', 'Anna', 'Smith', 'bob@example.com'),
+            ('carol', 'Carol', 'Hannaford', 'carol@example.com'),
+            ('dave', 'Dave', 'Jones', 'dave@example.com'),
+        ]:
+            User.objects.create_user(
+                username=username, password='pass', first_name=first, last_name=last, email=email
+            )
+        User.objects.create_user(username='annastaff', password='pass', is_staff=True)
+        User.objects.create_user(username='annagone', password='pass', is_active=False)
+
+    def _search(self, **params):
+        from .utils import get_tokens_for_user
+        self.client.cookies['access_token'] = get_tokens_for_user(self.staff)['access']
+        return self.client.get(reverse('auth-users-search'), params)
+
+    def test_results_are_ranked(self):
+        resp = self._search(q='anna')
+        self.assertEqual(resp.status_code, 200)
+        # exact username, username prefix, then first-name prefix
+        self.assertEqual([u['username'] for u in resp.json()], ['anna', 'annabelle', 'bob'])
+        self.assertEqual(set(resp.json()[0]), {'id', 'username', 'email', 'first_name', 'last_name', 'is_staff'})
+
+    @override_settings(USER_SEARCH_SUBSTRING=True)
+    def test_substring_matches_rank_last_when_enabled(self):
+        self.assertEqual([u['username'] for u in self._search(q='anna').json()], ['anna', 'annabelle', 'bob', 'carol'])
+
+    @override_settings(USER_SEARCH_MAX_CANDIDATES=1)
+    def test_name_prefix_candidates_are_bounded(self):
+        # Only the first first-name match in index order ('Zea') is ranked,
+        # although 'aaron' would sort first by username.
+        User.objects.create_user(username='aaron', password='pass', first_name='Zed')
+        User.objects.create_user(username='zara', password='pass', first_name='Zea')
+        self.assertEqual([u['username'] for u in self._search(q='ze').json()], ['zara'])
+
+    def test_index_keeps_updates_made_during_a_rebuild(self):
+        from unittest import mock
+        from . import search
+        from .search import prefix_index, reindex_user, unindex_user
+
+        self.addCleanup(prefix_index.__init__)
+        prefix_index.__init__()
+        bob = User.objects.get(username='bob')
+        read_rows = search.user_values
+
+        class ChangedMidRead:
+            """Reads the old rows, then applies signal updates before the swap."""
+            def __init__(self, queryset):
+                self.rows = list(read_rows(queryset))
+
+            def iterator(self, chunk_size):
+                reindex_user(User, User.objects.create_user(username='annika', password='pass'))
+                bob.username = 'annette'
+                bob.save()
+                reindex_user(User, bob)
+                carol = User.objects.get(username='carol')
+                unindex_user(User, carol)
+                carol.delete()
+                return iter(self.rows)
+
+        with mock.patch('authentication.search.user_values', ChangedMidRead):
+            prefix_index.build()
+        self.assertEqual(
+            [u['username'] for u in prefix_index.search('ann', 10)],
+            ['anna', 'annabelle', 'annette', 'annika'],
+        )
+        self.assertEqual(prefix_index.search('car', 10), [])
+        self.assertIsNone(prefix_index.pending)
+
+    def test_index_starts_one_background_build_at_a_time(self):
+        from unittest import mock
+        from .search import prefix_index
+
+        self.addCleanup(prefix_index.__init__)
+        prefix_index.__init__()
+        with mock.patch('authentication.search.threading.Thread') as thread:
+            prefix_index.ensure_fresh()
+            prefix_index.ensure_fresh()
+        thread.return_value.start.assert_called_once_with()
+
+    def test_limit_and_short_queries(self):
+        self.assertEqual(len(self._search(q='anna', limit=2).json()), 2)
+        # Two-character queries only match prefixes.
+        self.assertEqual([u['username'] for u in self._search(q='an').json()], ['anna', 'annabelle', 'bob'])
+
+    def test_in_process_index_matches_database_and_follows_signals(self):
+        from unittest import mock
+        from .search import prefix_index
+
+        with self.settings(USER_SEARCH_INDEX=True, USER_SEARCH_SUBSTRING=True):
+            self.addCleanup(prefix_index.__init__)
+            prefix_index.__init__()
+            # Requests never build the index; they use the database until a
+            # background build finishes.  Build it here so the test is deterministic.
+            with mock.patch('authentication.search.threading.Thread') as thread:
+                self.assertEqual([u['username'] for u in self._search(q='ann').json()][:2], ['anna', 'annabelle'])
+            thread.return_value.start.assert_called_once_with()
+            self.assertFalse(prefix_index.is_built())
+            prefix_index.build()
+            self.assertEqual(
+                [u['username'] for u in self._search(q='anna').json()],
+                ['anna', 'annabelle', 'bob', 'carol'],
+            )
+            from .search import reindex_user, unindex_user
+            new = User.objects.create_user(username='annika', password='pass')
+            reindex_user(User, new)
+            self.assertIn('annika', [u['username'] for u in self._search(q='ann').json()])
+            unindex_user(User, new)
+            self.assertNotIn('annika', [u['username'] for u in self._search(q='ann').json()])
+
+    def test_customer_cannot_search(self):
+        from .utils import get_tokens_for_user
+        customer = User.objects.get(username='anna')
+        self.client.cookies['access_token'] = get_tokens_for_user(customer)['access']
+        resp = self.client.get(reverse('auth-users-search'), {'q': 'a'})
+        self.assertEqual(resp.status_code, 403)
+
+
+class FastJSONTests(TestCase):
+    def setUp(self):
+        from datetime import datetime, timezone
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+
+        self.data = {
+            'users': [{'id': 1, 'username': 'zoë', 'is_staff': False}],
+            'when': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            'amount': Decimal('1.50'),
+            'label': gettext_lazy('Token is invalid or expired'),
+            'separator': 'a\u2028b',
+            1: None,
+        }
+
+    def test_renderer_output_matches_stock_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_float_exponents_differ_only_in_format(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+
+        data = {'big': 1e16, 'small': 1e-05, 'plain': 12.5}
+        self.assertEqual(FastJSONRenderer().render(data), b'{"big":1e16,"small":0.00001,"plain":12.5}')
+        self.assertEqual(JSONRenderer().render(data), b'{"big":1e+16,"small":1e-05,"plain":12.5}')
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), data)
+
+    def test_non_finite_floats_raise_like_stock_renderer(self):
+        from .renderers import FastJSONRenderer
+
+        self.assertEqual(FastJSONRenderer().render([None, 1.0]), b'[null,1.0]')
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'value': value, 'none': None})
+
+    def test_falls_back_without_orjson(self):
+        from unittest import mock
+        from rest_framework.renderers import JSONRenderer
+        from . import renderers
+
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+            self.assertEqual(renderers.FastJSONParser().parse(io.BytesIO(b'{"a": [1]}')), {'a': [1]})
+
+    def test_parser_errors_become_400(self):
+        resp = self.client.post(reverse('auth-login'), data='{"username": ', content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('JSON parse error', resp.json()['detail'])
+
+    def test_user_serializer_fast_path_matches_model_serializer(self):
+        from rest_framework import serializers
+        from .serializers import USER_FIELDS, UserSerializer
+
+        class StockUserSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = User
+                fields = USER_FIELDS
+
+        users = [
+            User.objects.create_user(username='fast', email='fast@example.com', first_name='Zoë'),
+            User.objects.create_user(username='staff', is_staff=True),
+        ]
+        self.assertEqual(UserSerializer(users, many=True).data, StockUserSerializer(users, many=True).data)
+        self.assertEqual(UserSerializer(users[0]).data, StockUserSerializer(users[0]).data)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from .utils import get_tokens_for_user
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(
+            PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0.0,
+            PROFILING_DIR=directory.name, PROFILING_MAX_REPORTS=2,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='pass')
+        self.staff_access = get_tokens_for_user(self.staff)['access']
+        self.customer_access = get_tokens_for_user(self.customer)['access']
+
+    def _me(self, access, **headers):
+        self.client.cookies['access_token'] = access
+        return self.client.get(reverse('auth-me'), **headers)
+
+    def _reports(self, **params):
+        self.client.cookies['access_token'] = self.staff_access
+        return self.client.get(reverse('auth-profiles'), params)
+
+    def test_trigger_header_profiles_staff_requests_only(self):
+        self._me(self.customer_access, HTTP_X_PROFILE='1')
+        self._me(self.staff_access)
+        self.assertEqual(self._reports().json(), [])
+
+        self._me(self.staff_access, HTTP_X_PROFILE='1')
+        reports = self._reports().json()
+        self.assertEqual([(r['view'], r['method']) for r in reports], [('MeView', 'GET')])
+
+    def test_sample_rate_and_ring_bound(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1.0):
+            from django.test import Client
+            client = Client()
+            client.post(reverse('auth-login'), data=json.dumps({'username': 'customer', 'password': 'pass'}),
+                        content_type='application/json')
+            client.get(reverse('auth-me'))
+            client.post(reverse('auth-refresh'))
+        reports = self._reports().json()
+        self.assertEqual([r['view'] for r in reports], ['RefreshTokenView', 'MeView'])
+        self.assertEqual([r['view'] for r in self._reports(view='MeView').json()], ['MeView'])
+
+    def test_download_report(self):
+        self._me(self.staff_access, HTTP_X_PROFILE='1')
+        name = self._reports().json()[0]['name']
+
+        resp = self.client.get(reverse('auth-profile', args=[name]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('attachment', resp['Content-Disposition'])
+        self.assertTrue(b''.join(resp.streaming_content))
+
+        resp = self.client.get(reverse('auth-profile', args=[name]), {'output': 'text'})
+        self.assertIn('function calls', resp.content.decode())
+
+        self.assertEqual(self.client.get(reverse('auth-profile', args=['..%2Fsecret'])).status_code, 404)
+
+    def test_customers_cannot_list_reports(self):
+        self.client.cookies['access_token'] = self.customer_access
+        self.assertEqual(self.client.get(reverse('auth-profiles')).status_code, 403)
+
+
+class AuthEventLogTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from . import events
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/events.log'
+        events.start(self.path, queue_size=100)
+        self.addCleanup(events.stop)
+
+        self.user = User.objects.create_user(username='customer', password='pass')
+
+    def _events(self):
+        from . import events
+        events.stop()
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def _login(self, password):
+        return self.client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': 'customer', 'password': password}),
+            content_type='application/json',
+        )
+
+    def test_session_events_are_logged_as_json_lines(self):
+        self._login('wrong')
+        self._login('pass')
+        self.client.post(reverse('auth-refresh'))
+        self.client.post(reverse('auth-logout-all'))
+
+        logged = self._events()
+        self.assertEqual(
+            [e['event'] for e in logged],
+            ['login_failed', 'login', 'token_refreshed', 'logout_all'],
+        )
+        self.assertEqual(logged[0]['reason'], 'invalid_credentials')
+        self.assertEqual(logged[1]['user_id'], self.user.pk)
+        self.assertTrue(logged[2]['rotated'])
+        self.assertEqual(logged[3]['by_user_id'], self.user.pk)
+        self.assertIn('ip', logged[0])
+
+    def test_full_queue_drops_and_counts(self):
+        import logging
+        import queue
+        from .events import DropCountingQueueHandler
+
+        handler = DropCountingQueueHandler(queue.Queue(maxsize=1))
+        for _ in range(3):
+            handler.emit(logging.makeLogRecord({'msg': 'login'}))
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 2)
+
+    def test_drops_are_reported_on_stop(self):
+        from unittest import mock
+        from . import events
+
+        events._listener.queue_handler.dropped = 5
+        self.assertEqual(self._events(), [{'ts': mock.ANY, 'event': 'events_dropped', 'count': 5}])
+
+
+class CompactTokenTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+
+    @staticmethod
+    def _payload(raw):
+        import jwt
+        return jwt.decode(raw, options={'verify_signature': False})
+
+    def _login(self, client=None, username='customer'):
+        client = client or self.client
+        return client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': username, 'password': 'pass'}),
+            content_type='application/json',
+        )
+
+    @override_settings(JWT_COMPACT_TOKENS=True)
+    def test_session_uses_compact_claims(self):
+        resp = self._login()
+        access = self._payload(resp.cookies['access_token'].value)
+        refresh = self._payload(resp.cookies['refresh_token'].value)
+        self.assertEqual(set(access), {'t', 'exp', 'j', 'u'})
+        self.assertEqual((access['t'], refresh['t'], access['u']), (1, 2, self.user.pk))
+        self.assertEqual(len(access['j']), 12)
+
+        self.assertEqual(self.client.get(reverse('auth-me')).json()['username'], 'customer')
+        resp = self.client.post(reverse('auth-refresh'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._payload(resp.cookies['refresh_token'].value)['t'], 2)
+        self.assertEqual(self.client.get(reverse('auth-me')).status_code, 200)
+
+    @override_settings(JWT_COMPACT_TOKENS=True)
+    def test_generation_claim_appears_after_logout_all(self):
+        self._login()
+        self.client.post(reverse('auth-logout-all'))
+        resp = self._login()
+        self.assertEqual(self._payload(resp.cookies['access_token'].value)['g'], 1)
+        self.assertEqual(self.client.get(reverse('auth-me')).status_code, 200)
+
+    def test_sessions_survive_switching_profiles(self):
+        from django.test import Client
+        verbose = Client()
+        self._login(verbose)
+        with self.settings(JWT_COMPACT_TOKENS=True):
+            compact = Client()
+            self._login(compact)
+            self.assertEqual(verbose.get(reverse('auth-me')).status_code, 200)
+            self.assertEqual(verbose.post(reverse('auth-refresh')).status_code, 200)
+        self.assertEqual(compact.get(reverse('auth-me')).status_code, 200)
+        self.assertEqual(compact.post(reverse('auth-refresh')).status_code, 200)
+
+    def test_token_types_are_not_interchangeable(self):
+        from rest_framework_simplejwt.exceptions import TokenError
+        from .tokens import CompactAccessToken, CompactRefreshToken
+
+        refresh = CompactRefreshToken.for_user(self.user)
+        with self.assertRaises(TokenError):
+            CompactAccessToken(str(refresh))
+        with self.assertRaises(TokenError):
+            CompactRefreshToken(str(refresh.access_token))
+
+    @override_settings(JWT_COMPACT_TOKENS=True)
+    def test_diagnostic_flow_and_bulk_minting(self):
+        from django.test import Client
+        from .minting import mint_tokens_bulk
+        from .tokens import CompactAccessToken, CompactRefreshToken
+
+        staff = Client()
+        self._login(staff, 'staff')
+        code = staff.post(
+            reverse('auth-diagnostic-login'),
+            data=json.dumps({'customer_id': self.user.pk}),
+            content_type='application/json',
+        ).json()['code']
+        tab = Client()
+        resp = tab.post(reverse('auth-exchange'), data=json.dumps({'code': code}), content_type='application/json')
+        self.assertEqual(self._payload(resp.cookies['staff_access_token'].value)['u'], self.staff.pk)
+        self.assertEqual(tab.get(reverse('auth-diagnostic-info')).json()['staff']['username'], 'staff')
+
+        pair = mint_tokens_bulk([self.user.pk])['tokens'][0]
+        self.assertEqual(CompactAccessToken(pair['access'])['user_id'], self.user.pk)
+        self.assertEqual(set(CompactRefreshToken(pair['refresh']).payload), {'t', 'exp', 'j', 'u'})
+
+
+class VerifyTokensCommandTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from datetime import timedelta
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .tokens import CompactRefreshToken
+
+        self.user = User.objects.create_user(username='customer', password='pass')
+        self.access = AccessToken.for_user(self.user)
+        self.compact = CompactRefreshToken.for_user(self.user)
+        expired = AccessToken.for_user(self.user)
+        expired.set_exp(lifetime=timedelta(seconds=-10))
+        self.expired = expired
+        header, _, signature = str(self.access).split('.')
+        forged = '.'.join([header, str(expired).split('.')[1], signature])
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/tokens.txt'
+        with open(self.path, 'w') as f:
+            f.write('\n'.join([str(self.access), '', f'  {self.compact}  ', str(expired), forged, 'not-a-token']))
+
+    def verify(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('verify_tokens', self.path, stdout=out, stderr=StringIO(), **options)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_reports_validity_and_claims_per_line(self):
+        results = self.verify()
+        self.assertEqual([r['line'] for r in results], [1, 3, 4, 5, 6])
+        self.assertEqual(results[0], {
+            'line': 1, 'valid': True, 'reason': None, 'token_type': 'access',
+            'user_id': self.user.pk, 'jti': self.access['jti'], 'exp': self.access['exp'],
+        })
+        self.assertEqual(
+            (results[1]['valid'], results[1]['token_type'], results[1]['user_id'], results[1]['jti']),
+            (True, 'refresh', self.user.pk, self.compact['jti']),
+        )
+        self.assertEqual(
+            (results[2]['valid'], results[2]['reason'], results[2]['user_id'], results[2]['jti']),
+            (False, 'expired', self.user.pk, self.expired['jti']),
+        )
+        self.assertEqual((results[3]['reason'], results[3]['user_id']), ('bad_signature', None))
+        self.assertEqual(results[4]['reason'], 'malformed')
+
+    def test_process_pool_keeps_input_order(self):
+        self.assertEqual(self.verify(processes=2, chunk_size=2), self.verify())
+
+
+class DiagnosticSessionReportTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import DiagnosticExchangeCode
+
+        self.staff = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.other_staff = User.objects.create_user(username='staff2', password='pass', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='pass')
+
+        self.client.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': 'staff', 'password': 'pass'}),
+            content_type='application/json',
+        )
+        code = self.client.post(
+            reverse('auth-diagnostic-login'),
+            data=json.dumps({'customer_id': self.customer.id}),
+            content_type='application/json',
+        ).json()['code']
+        from django.test import Client
+        Client().post(reverse('auth-exchange'), data=json.dumps({'code': code}), content_type='application/json')
+        self.redeemed = DiagnosticExchangeCode.objects.get(code=code)
+
+        expired = DiagnosticExchangeCode.objects.create(staff_user=self.staff, customer_user=self.customer)
+        DiagnosticExchangeCode.objects.filter(pk=expired.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        DiagnosticExchangeCode.objects.create(staff_user=self.other_staff, customer_user=self.customer)
+
+    def test_exchange_records_redemption_time(self):
+        self.assertTrue(self.redeemed.used)
+        self.assertGreaterEqual(self.redeemed.redeemed_at, self.redeemed.created_at)
+
+    def test_aggregates_per_staff_user_in_grouped_queries(self):
+        # User lookup for the staff check, then the grouped and the total aggregate.
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse('auth-diagnostic-sessions'))
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        staff, other = data['staff']
+        self.assertEqual((staff['staff_username'], other['staff_username']), ('staff', 'staff2'))
+        self.assertEqual(
+            (staff['started'], staff['redeemed'], staff['expired_unused'], staff['pending']), (2, 1, 1, 0)
+        )
+        self.assertGreaterEqual(staff['avg_seconds_to_redeem'], 0)
+        self.assertEqual((other['started'], other['pending'], other['avg_seconds_to_redeem']), (1, 1, None))
+        self.assertEqual(
+            (data['totals']['started'], data['totals']['redeemed'], data['totals']['expired_unused']), (3, 1, 1)
+        )
+
+    def test_filters_by_staff_user(self):
+        resp = self.client.get(reverse('auth-diagnostic-sessions'), {'staff_user': self.other_staff.id})
+        self.assertEqual([row['staff_username'] for row in resp.json()['staff']], ['staff2'])
+
+    def test_detail_streams_sessions_as_ndjson(self):
+        resp = self.client.get(reverse('auth-diagnostic-sessions'), {'detail': 'true'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        rows = [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual([row['status'] for row in rows], ['expired', 'redeemed', 'pending'])
+        self.assertEqual(rows[1]['code'], str(self.redeemed.code))
+        self.assertIsNotNone(rows[1]['seconds_to_redeem'])
+
+    def test_requires_staff(self):
+        from django.test import Client
+        customer = Client()
+        customer.post(
+            reverse('auth-login'),
+            data=json.dumps({'username': 'customer', 'password': 'pass'}),
+            content_type='application/json',
+        )
+        self.assertEqual(customer.get(reverse('auth-diagnostic-sessions')).status_code, 403)
+
+    def test_report_command(self):
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command('diagnostic_report', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[1].split()[:5], ['staff', '2', '1', '1', '0'])
+        self.assertEqual(lines[-1].split()[:5], ['total', '3', '1', '1', '1'])
+
+        out = io.StringIO()
+        call_command('diagnostic_report', detail=True, staff_user=self.other_staff.id, stdout=out)
+        self.assertEqual([json.loads(line)['status'] for line in out.getvalue().splitlines()], ['pending'])
@@ -0,0 +1,123 @@
+"""
+Opt-in compact token profile (``JWT_COMPACT_TOKENS``).
+
+Compact tokens store the simplejwt claims under one-letter names (``t``,
+``j``, ``u``, ``g``), use integer token types, carry a 12-character ``jti``
+instead of a 32-character UUID and leave out the token generation while it
+is 0 (the default ``token_generation_is_current`` assumes).  ``exp`` keeps
+its registered name so the token backends still check it.
+
+The classes translate the configured claim names on every read and write,
+so ``token[api_settings.USER_ID_CLAIM]`` and friends work unchanged on both
+profiles.  ``AUTH_TOKEN_CLASSES`` lists both access-token classes, which
+keeps sessions valid across a switch of ``JWT_COMPACT_TOKENS`` in either
+direction; only newly issued tokens follow the setting.
+"""
+import secrets
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+# Configured claim name -> compact payload key.
+COMPACT_CLAIMS = {
+    api_settings.TOKEN_TYPE_CLAIM: 't',
+    api_settings.JTI_CLAIM: 'j',
+    api_settings.USER_ID_CLAIM: 'u',
+    settings.TOKEN_GENERATION_CLAIM: 'g',
+}
+# Compact claims left out of the payload while they hold this value.
+COMPACT_DEFAULTS = {'g': 0}
+
+COMPACT_ACCESS_TYPE = 1
+COMPACT_REFRESH_TYPE = 2
+
+
+def compact_jti():
+    """Return a random 72-bit token ID as 12 URL-safe characters."""
+    return secrets.token_urlsafe(9)
+
+
+class CompactTokenMixin:
+    """Store the simplejwt claims under ``COMPACT_CLAIMS`` keys."""
+
+    def __init__(self, token=None, verify=True):
+        super().__init__(token, verify)
+        if token is None:
+            # Token.__init__ writes the type claim under its configured name.
+            self.payload = {COMPACT_CLAIMS.get(key, key): value for key, value in self.payload.items()}
+
+    def __getitem__(self, key):
+        return self.payload[COMPACT_CLAIMS.get(key, key)]
+
+    def __setitem__(self, key, value):
+        key = COMPACT_CLAIMS.get(key, key)
+        if key in COMPACT_DEFAULTS and COMPACT_DEFAULTS[key] == value:
+            self.payload.pop(key, None)
+        else:
+            self.payload[key] = value
+
+    def __delitem__(self, key):
+        del self.payload[COMPACT_CLAIMS.get(key, key)]
+
+    def __contains__(self, key):
+        return COMPACT_CLAIMS.get(key, key) in self.payload
+
+    def get(self, key, default=None):
+        return self.payload.get(COMPACT_CLAIMS.get(key, key), default)
+
+    def verify(self):
+        self.check_exp()
+        if 'j' not in self.payload:
+            raise TokenError(_('Token has no id'))
+        self.verify_token_type()
+
+    def verify_token_type(self):
+        try:
+            token_type = self.payload['t']
+        except KeyError:
+            raise TokenError(_('Token has no type'))
+        if self.token_type != token_type:
+            raise TokenError(_('Token has wrong type'))
+
+    def set_jti(self):
+        self.payload['j'] = compact_jti()
+
+
+class CompactAccessToken(CompactTokenMixin, AccessToken):
+    token_type = COMPACT_ACCESS_TYPE
+
+
+class CompactRefreshToken(CompactTokenMixin, RefreshToken):
+    token_type = COMPACT_REFRESH_TYPE
+    no_copy_claims = ('t', 'exp', 'j')
+
+    @property
+    def access_token(self):
+        access = CompactAccessToken()
+        # Expire relative to the refresh token, as RefreshToken.access_token does.
+        access.set_exp(from_time=self.current_time)
+        for claim, value in self.payload.items():
+            if claim not in self.no_copy_claims:
+                access.payload[claim] = value
+        return access
+
+
+def get_token_classes():
+    """Return the ``(access, refresh)`` token classes new tokens are issued with."""
+    if settings.JWT_COMPACT_TOKENS:
+        return CompactAccessToken, CompactRefreshToken
+    return AccessToken, RefreshToken
+
+
+def parse_refresh_token(raw_token):
+    """Validate a refresh token of either profile, trying the configured one first."""
+    classes = (CompactRefreshToken, RefreshToken)
+    if not settings.JWT_COMPACT_TOKENS:
+        classes = classes[::-1]
+    try:
+        return classes[0](raw_token)
+    except TokenError:
+        return classes[1](raw_token)
@@ -2,21 +2,37 @@ from django.urls import path
 from .views import (
     LoginView,
     LogoutView,
+    LogoutAllView,
     RefreshTokenView,
     MeView,
+    BootstrapView,
     UserListView,
+    UserSearchView,
     DiagnosticLoginView,
     ExchangeCodeView,
     DiagnosticInfoView,
+    BulkTokenView,
+    IntrospectView,
+    DiagnosticSessionReportView,
+    ProfileReportListView,
+    ProfileReportView,
 )
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='auth-login'),
     path('logout/', LogoutView.as_view(), name='auth-logout'),
+    path('logout-all/', LogoutAllView.as_view(), name='auth-logout-all'),
     path('refresh/', RefreshTokenView.as_view(), name='auth-refresh'),
     path('me/', MeView.as_view(), name='auth-me'),
+    path('bootstrap/', BootstrapView.as_view(), name='auth-bootstrap'),
     path('users/', UserListView.as_view(), name='auth-users'),
+    path('users/search/', UserSearchView.as_view(), name='auth-users-search'),
     path('diagnostic-login/', DiagnosticLoginView.as_view(), name='auth-diagnostic-login'),
     path('exchange/', ExchangeCodeView.as_view(), name='auth-exchange'),
     path('diagnostic-info/', DiagnosticInfoView.as_view(), name='auth-diagnostic-info'),
+    path('tokens/bulk/', BulkTokenView.as_view(), name='auth-tokens-bulk'),
+    path('introspect/', IntrospectView.as_view(), name='auth-introspect'),
+    path('diagnostic-sessions/', DiagnosticSessionReportView.as_view(), name='auth-diagnostic-sessions'),
+    path('profiles/', ProfileReportListView.as_view(), name='auth-profiles'),
+    path('profiles/<str:name>/', ProfileReportView.as_view(), name='auth-profile'),
 ]
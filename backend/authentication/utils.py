@@ -2,18 +2,142 @@
 Utility helpers for cookie-based JWT token management.
 """
 from django.conf import settings
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings
 
+from .models import TokenGeneration
+from .tokens import get_token_classes
 
-def get_tokens_for_user(user):
-    """Generate access and refresh tokens for a user."""
-    refresh = RefreshToken.for_user(user)
+
+def _generation_cache_key(user_id):
+    return f'token-generation:{user_id}'
+
+
+def get_token_generations(user_ids):
+    """Return ``{user_id: generation}`` for ``user_ids``.
+
+    Served from the cache where possible; misses are resolved with a single
+    query and cached for ``TOKEN_GENERATION_CACHE_TIMEOUT`` seconds.
+    """
+    keys = {_generation_cache_key(uid): uid for uid in user_ids}
+    cached = cache.get_many(keys)
+    generations = {keys[key]: value for key, value in cached.items()}
+
+    missing = [uid for uid in keys.values() if uid not in generations]
+    if missing:
+        found = dict(
+            TokenGeneration.objects.filter(user_id__in=missing).values_list('user_id', 'generation')
+        )
+        fetched = {uid: found.get(uid, 0) for uid in missing}
+        cache.set_many(
+            {_generation_cache_key(uid): gen for uid, gen in fetched.items()},
+            settings.TOKEN_GENERATION_CACHE_TIMEOUT,
+        )
+        generations.update(fetched)
+    return generations
+
+
+def get_token_generation(user_id):
+    """Return the current token generation for a single user."""
+    return get_token_generations([user_id])[user_id]
+
+
+def read_token_generation(user_id):
+    """Return ``user_id``'s generation from the database and re-cache it.
+
+    Used when minting, and when a token is newer than the cached value.  The
+    default cache is per process, so another worker's ``bump_token_generation``
+    does not reach this one's cache; tokens must never be minted at a stale
+    generation the other workers already reject.
+    """
+    generation = (
+        TokenGeneration.objects.filter(user_id=user_id).values_list('generation', flat=True).first() or 0
+    )
+    _cache_generation(user_id, generation)
+    return generation
+
+
+def _cache_generation(user_id, generation):
+    cache.set(_generation_cache_key(user_id), generation, settings.TOKEN_GENERATION_CACHE_TIMEOUT)
+
+
+def bump_token_generation(user_id):
+    """Invalidate every token issued so far for ``user_id``.
+
+    A single ``UPDATE`` in the common case; the row is created on the first
+    bump.  The cached value is dropped so the next check reads the new one.
+    """
+    updated = TokenGeneration.objects.filter(user_id=user_id).update(generation=F('generation') + 1)
+    if not updated:
+        try:
+            with transaction.atomic():
+                TokenGeneration.objects.create(user_id=user_id, generation=1)
+        except IntegrityError:
+            # Created concurrently by another bump; apply ours on top of it.
+            TokenGeneration.objects.filter(user_id=user_id).update(generation=F('generation') + 1)
+    cache.delete(_generation_cache_key(user_id))
+
+
+def token_generation_is_current(token, generations=None):
+    """Return whether ``token`` was issued at its user's current generation.
+
+    ``generations`` may be a pre-fetched ``{user_id: generation}`` mapping
+    (see ``get_token_generations``) when checking many tokens at once.
+    Generations only grow, so a token newer than the cached value means the
+    cache is stale (the bump happened in another worker) and the database
+    decides.
+    """
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None:
+        return False
+    if generations is None:
+        current = get_token_generation(user_id)
+    else:
+        current = generations[user_id]
+    generation = token.get(settings.TOKEN_GENERATION_CLAIM, 0)
+    if generation > current:
+        current = read_token_generation(user_id)
+        if generations is not None:
+            generations[user_id] = current
+    return generation == current
+
+
+def get_tokens_for_user(user, generation=None):
+    """Generate access and refresh tokens for a user.
+
+    Both tokens carry the user's current token generation, read from the
+    database (unless the caller already did and passes ``generation``), so
+    that ``bump_token_generation`` can revoke them later.
+    """
+    if generation is None:
+        generation = read_token_generation(user.pk)
+    else:
+        _cache_generation(user.pk, generation)
+    refresh = get_token_classes()[1].for_user(user)
+    refresh[settings.TOKEN_GENERATION_CLAIM] = generation
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
     }
 
 
+def get_access_token_for_user(user, generation=None):
+    """Generate a standalone access token for a user (no refresh token).
+
+    Used for the staff member's audit token in diagnostic sessions.
+    ``generation`` is as for ``get_tokens_for_user``.
+    """
+    if generation is None:
+        generation = read_token_generation(user.pk)
+    else:
+        _cache_generation(user.pk, generation)
+    access = get_token_classes()[0].for_user(user)
+    access[settings.TOKEN_GENERATION_CLAIM] = generation
+    return str(access)
+
+
 def _cookie_kwargs(max_age=None):
     """Return common cookie keyword arguments."""
     kwargs = dict(
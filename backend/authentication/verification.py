@@ -0,0 +1,183 @@
+"""
+Offline bulk token verification for incident forensics.
+
+``verify_token_stream`` reads tokens one per line and yields one result per
+token, in input order: ``valid``, a ``reason`` when it is not, and the
+``token_type``, ``user_id``, ``jti`` and ``exp`` claims.  Tokens are checked
+against the configured ``SIMPLE_JWT`` keys, algorithm, audience, issuer and
+leeway, in either token profile (``JWT_COMPACT_TOKENS``), exactly as far as
+the token itself goes: revocations (token generations, logout-all) live in
+the database and are not consulted.
+
+Claims are reported whenever the signature verifies, so expired tokens still
+show whose they were.  Work is split into chunks of ``chunk_size`` lines that
+can be spread over a process pool; at most two chunks per worker are in
+flight at a time, so memory stays flat however long the input is.  Workers
+receive only plain data, as in ``authentication.minting``.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import jwt
+from jwt import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidSignatureError,
+    InvalidTokenError,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .codec import HS256Codec, UnsupportedToken
+from .tokens import COMPACT_CLAIMS, CompactAccessToken, CompactRefreshToken
+
+
+def _verifier_config():
+    if api_settings.JWK_URL:
+        raise ValueError('Tokens signed with JWKS keys cannot be verified offline.')
+    algorithm = api_settings.ALGORITHM
+    leeway = api_settings.LEEWAY
+    if isinstance(leeway, timedelta):
+        leeway = leeway.total_seconds()
+    return {
+        'algorithm': algorithm,
+        'key': api_settings.SIGNING_KEY if algorithm.startswith('HS') else api_settings.VERIFYING_KEY,
+        'audience': api_settings.AUDIENCE,
+        'issuer': api_settings.ISSUER,
+        'leeway': leeway,
+    }
+
+
+def _profiles():
+    """Claim names and token types of both token profiles, as plain data."""
+    def profile(names, access, refresh):
+        return {
+            'token_type': names.get(api_settings.TOKEN_TYPE_CLAIM, api_settings.TOKEN_TYPE_CLAIM),
+            'jti': names.get(api_settings.JTI_CLAIM, api_settings.JTI_CLAIM),
+            'user_id': names.get(api_settings.USER_ID_CLAIM, api_settings.USER_ID_CLAIM),
+            'types': {access.token_type: 'access', refresh.token_type: 'refresh'},
+        }
+    return (
+        profile({}, AccessToken, RefreshToken),
+        profile(COMPACT_CLAIMS, CompactAccessToken, CompactRefreshToken),
+    )
+
+
+def _make_verifier(algorithm, key, audience, issuer, leeway):
+    """Return a ``token -> payload`` callable that raises ``jwt.InvalidTokenError``."""
+    def verify(token):
+        return jwt.decode(
+            token, key, algorithms=[algorithm], audience=audience, issuer=issuer,
+            leeway=leeway, options={'verify_aud': audience is not None},
+        )
+
+    if algorithm != HS256Codec.algorithm or audience is not None or issuer is not None:
+        return verify
+
+    codec = HS256Codec(key)
+
+    def verify_fast(token):
+        try:
+            return codec.decode(token, leeway=leeway)
+        except UnsupportedToken:
+            return verify(token)
+    return verify_fast
+
+
+def _read_claims(payload, profiles, result):
+    """Copy the reported claims into ``result``; return why they are unusable, if they are."""
+    result['exp'] = payload.get('exp')
+    for profile in profiles:
+        token_type = profile['types'].get(payload.get(profile['token_type']))
+        if token_type is not None:
+            break
+    else:
+        if any(profile['token_type'] in payload for profile in profiles):
+            return 'unknown_type'
+        return 'no_type'
+
+    result['token_type'] = token_type
+    result['user_id'] = payload.get(profile['user_id'])
+    result['jti'] = payload.get(profile['jti'])
+    if result['jti'] is None:
+        return 'no_jti'
+    if result['user_id'] is None:
+        return 'no_user_id'
+    return None
+
+
+def _verify_one(verify, profiles, line, token):
+    result = {
+        'line': line, 'valid': False, 'reason': None,
+        'token_type': None, 'user_id': None, 'jti': None, 'exp': None,
+    }
+    try:
+        payload = verify(token)
+    except (ExpiredSignatureError, ImmatureSignatureError) as e:
+        # Raised only once the signature has verified, so the claims are genuine.
+        result['reason'] = 'expired' if isinstance(e, ExpiredSignatureError) else 'not_yet_valid'
+        payload = jwt.decode(token, options={'verify_signature': False})
+    except InvalidSignatureError:
+        result['reason'] = 'bad_signature'
+        return result
+    except DecodeError:
+        result['reason'] = 'malformed'
+        return result
+    except InvalidTokenError:
+        result['reason'] = 'invalid'
+        return result
+
+    problem = _read_claims(payload, profiles, result)
+    result['reason'] = result['reason'] or problem
+    result['valid'] = result['reason'] is None
+    return result
+
+
+def _verify_chunk(config, profiles, tokens):
+    """Verify ``(line, token)`` pairs. Runs in the caller or a worker."""
+    verify = _make_verifier(**config)
+    return [_verify_one(verify, profiles, line, token) for line, token in tokens]
+
+
+def _chunks(lines, chunk_size):
+    chunk = []
+    for line_number, line in enumerate(lines, 1):
+        token = line.strip()
+        if not token:
+            continue
+        chunk.append((line_number, token))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def verify_token_stream(lines, processes=0, chunk_size=1000):
+    """Yield a result dict for every non-blank line of ``lines``, in order.
+
+    Each result has the 1-based input ``line``, ``valid``, ``reason`` (``None``
+    for valid tokens) and the ``token_type``, ``user_id``, ``jti`` and ``exp``
+    claims.  With ``processes`` > 1 chunks of ``chunk_size`` tokens are
+    verified in a process pool.  Raises ``ValueError`` if the configured keys
+    cannot be used offline.
+    """
+    config = _verifier_config()
+    profiles = _profiles()
+    chunks = _chunks(lines, chunk_size)
+
+    if not processes or processes <= 1:
+        for chunk in chunks:
+            yield from _verify_chunk(config, profiles, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_verify_chunk, config, profiles, chunk))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
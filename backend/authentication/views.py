@@ -2,20 +2,66 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import timedelta
+import json
+import time
 
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
 
+from . import events
+from .analytics import session_rows, session_stats
+from .backends import BearerJWTAuthentication, CookieJWTAuthentication
 from .models import DiagnosticExchangeCode
-from .serializers import UserSerializer, LoginSerializer, DiagnosticLoginSerializer
-from .utils import get_tokens_for_user, set_auth_cookies, set_diagnostic_cookies, clear_auth_cookies
+from .minting import mint_tokens_bulk
+from .profiling import list_reports, render_report, report_path
+from .search import search_customers
+from .tokens import parse_refresh_token
+from .serializers import (
+    USER_FIELDS,
+    UserSerializer,
+    LoginSerializer,
+    DiagnosticLoginSerializer,
+    BulkTokenSerializer,
+    IntrospectSerializer,
+    LogoutAllSerializer,
+    UserSearchSerializer,
+    BootstrapSerializer,
+    DiagnosticSessionReportSerializer,
+    user_values,
+)
+from .utils import (
+    get_tokens_for_user,
+    get_access_token_for_user,
+    set_auth_cookies,
+    set_diagnostic_cookies,
+    clear_auth_cookies,
+    bump_token_generation,
+    token_generation_is_current,
+)
+
+
+def _diagnostic_staff_token(request):
+    """Return the validated ``staff_access_token`` of a diagnostic session, or ``None``."""
+    staff_token_str = request.COOKIES.get(settings.STAFF_ACCESS_TOKEN_COOKIE)
+    if not staff_token_str:
+        return None
+    try:
+        validated_token = JWTAuthentication().get_validated_token(staff_token_str)
+    except (TokenError, InvalidToken):
+        return None
+    if not token_generation_is_current(validated_token):
+        return None
+    return validated_token
 
 
 class LoginView(APIView):
@@ -24,6 +70,8 @@ class LoginView(APIView):
     Optionally restrict to staff-only or customer-only depending on the
     ``require_staff`` query parameter supplied by the frontend.
     """
+    # Never reads request.user, so skip the user query authentication would run.
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     def post(self, request):
@@ -35,6 +83,7 @@ class LoginView(APIView):
 
         user = authenticate(request, username=username, password=password)
         if user is None:
+            events.emit('login_failed', request, username=username, reason='invalid_credentials')
             return Response(
                 {'detail': 'Invalid credentials.'},
                 status=status.HTTP_401_UNAUTHORIZED,
@@ -43,12 +92,14 @@ class LoginView(APIView):
         # Enforce staff-only login when the frontend requests it
         require_staff = request.query_params.get('require_staff', 'false').lower() == 'true'
         if require_staff and not user.is_staff:
+            events.emit('login_failed', request, username=username, reason='staff_required')
             return Response(
                 {'detail': 'Staff access required.'},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
         tokens = get_tokens_for_user(user)
+        events.emit('login', request, user_id=user.pk, is_staff=user.is_staff)
         response = Response({
             'user': UserSerializer(user).data,
         })
@@ -66,8 +117,45 @@ class LogoutView(APIView):
         return response
 
 
+class LogoutAllView(APIView):
+    """
+    Revoke every token issued so far for a user ("log out everywhere").
+
+    Bumps the user's token generation, which invalidates all outstanding
+    access and refresh tokens at once.  Users revoke their own sessions;
+    staff may pass ``user_id`` to revoke another user's.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = LogoutAllSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user_id = serializer.validated_data.get('user_id', request.user.pk)
+        if user_id != request.user.pk:
+            if not request.user.is_staff:
+                return Response(
+                    {'detail': 'Staff access required.'},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            if not User.objects.filter(pk=user_id).exists():
+                return Response(
+                    {'detail': 'User not found.'},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+        bump_token_generation(user_id)
+        events.emit('logout_all', request, user_id=user_id, by_user_id=request.user.pk)
+        response = Response({'detail': 'All sessions logged out.'})
+        if user_id == request.user.pk:
+            clear_auth_cookies(response)
+        return response
+
+
 class RefreshTokenView(APIView):
     """Use the refresh token cookie to obtain a new access token."""
+    # Never reads request.user, so skip the user query authentication would run.
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     def post(self, request):
@@ -79,7 +167,9 @@ class RefreshTokenView(APIView):
             )
 
         try:
-            token = RefreshToken(refresh_token)
+            token = parse_refresh_token(refresh_token)
+            if not token_generation_is_current(token):
+                raise TokenError('Token has been revoked')
             access_token = str(token.access_token)
 
             if settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS', False):
@@ -92,11 +182,17 @@ class RefreshTokenView(APIView):
                 new_refresh_token = refresh_token
 
         except TokenError as e:
+            events.emit('refresh_failed', request, reason=str(e))
             return Response(
                 {'detail': str(e)},
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
+        events.emit(
+            'token_refreshed', request,
+            user_id=token.get(api_settings.USER_ID_CLAIM),
+            rotated=new_refresh_token != refresh_token,
+        )
         response = Response({'detail': 'Token refreshed.'})
         set_auth_cookies(response, access_token, new_refresh_token)
         return response
@@ -107,7 +203,16 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response(UserSerializer(request.user).data)
+        # Only the exposed columns, instead of loading the whole lazy user.
+        try:
+            user = user_values(User.objects.filter(is_active=True)).get(pk=request.user.pk)
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found or inactive.', code='user_inactive')
+        return Response(user)
+
+
+def _customers():
+    return User.objects.filter(is_staff=False, is_active=True).order_by('username')
 
 
 class UserListView(APIView):
@@ -115,8 +220,67 @@ class UserListView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        customers = User.objects.filter(is_staff=False, is_active=True).order_by('username')
-        return Response(UserSerializer(customers, many=True).data)
+        return Response(list(user_values(_customers())))
+
+
+class BootstrapView(APIView):
+    """
+    Everything a frontend needs on page load, in one authenticated request.
+
+    Returns the current ``user``; the ``staff`` member behind a diagnostic
+    session (``None`` outside one, read from the ``staff_access_token``
+    cookie as ``DiagnosticInfoView`` does); ``access_expires_in``, the seconds
+    left on the access token; and, for staff with ``?customers=true``, the
+    ``customers`` list ``users/`` returns.  Both users come from one query.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = BootstrapSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        staff_token = _diagnostic_staff_token(request)
+        staff_id = staff_token.get(api_settings.USER_ID_CLAIM) if staff_token is not None else None
+        users = {
+            user['id']: user
+            for user in user_values(User.objects.filter(
+                is_active=True, pk__in={request.user.pk, staff_id} - {None},
+            ))
+        }
+        user = users.get(request.user.pk)
+        if user is None:
+            raise AuthenticationFailed('User not found or inactive.', code='user_inactive')
+        staff = users.get(staff_id)
+
+        data = {
+            'user': user,
+            'staff': staff,
+            'diagnostic': staff is not None,
+            'access_expires_in': max(0, int(request.auth['exp'] - time.time())),
+        }
+        if serializer.validated_data['customers'] and user['is_staff']:
+            data['customers'] = list(user_values(_customers()))
+        return Response(data)
+
+
+class UserSearchView(APIView):
+    """
+    Ranked customer search for the intranet picker. Staff only.
+
+    ``?q=<text>&limit=<n>`` matches username, first/last name and email by
+    prefix (and by substring for longer queries); see
+    ``authentication.search``.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = UserSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(search_customers(
+            serializer.validated_data['q'],
+            serializer.validated_data['limit'],
+        ))
 
 
 class DiagnosticLoginView(APIView):
@@ -124,10 +288,9 @@ class DiagnosticLoginView(APIView):
     Staff-only endpoint. Creates a short-lived exchange code that can be used
     to open the customer frontend in a new tab as a specific customer.
 
-    The staff member's own access token is stored alongside the customer
-    tokens so that the customer frontend can set both as session cookies.
-    This allows the backend to identify which staff member initiated the
-    session on every subsequent request.
+    No tokens are signed here: the exchange record only links the staff
+    member to the customer.  ``ExchangeCodeView`` mints the customer's tokens
+    and the staff member's audit token when the code is redeemed.
     """
     permission_classes = [IsAdminUser]
 
@@ -137,33 +300,22 @@ class DiagnosticLoginView(APIView):
 
         customer_id = serializer.validated_data['customer_id']
         try:
-            customer = User.objects.get(id=customer_id, is_staff=False, is_active=True)
+            customer = user_values(User.objects.filter(is_staff=False, is_active=True)).get(id=customer_id)
         except User.DoesNotExist:
             return Response(
                 {'detail': 'Customer not found.'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Generate tokens for the customer
-        customer_tokens = get_tokens_for_user(customer)
-
-        # Capture the staff member's current access token from their cookie.
-        # This will be stored in the exchange record and later set as a
-        # session cookie on the customer frontend for audit purposes.
-        staff_access_token = request.COOKIES.get(settings.ACCESS_TOKEN_COOKIE, '')
-
         # Store a short-lived exchange code
         exchange = DiagnosticExchangeCode.objects.create(
-            staff_user=request.user,
-            customer_user=customer,
-            customer_access_token=customer_tokens['access'],
-            customer_refresh_token=customer_tokens['refresh'],
-            staff_access_token=staff_access_token,
+            staff_user_id=request.user.pk,
+            customer_user_id=customer['id'],
         )
 
         return Response({
             'code': str(exchange.code),
-            'customer': UserSerializer(customer).data,
+            'customer': customer,
         })
 
 
@@ -172,14 +324,17 @@ class ExchangeCodeView(APIView):
     Exchange a one-time diagnostic code for session-scoped JWT cookies.
 
     Sets three session cookies (no max_age — expire when the browser tab
-    closes):
+    closes), all minted at redemption time:
     * ``access_token``       — customer JWT (used by DRF for auth)
     * ``refresh_token``      — customer refresh JWT
-    * ``staff_access_token`` — the initiating staff member's JWT
+    * ``staff_access_token`` — an access JWT for the initiating staff member,
+                               used for audit logging
 
     The response body includes both user objects so the frontend can display
     a diagnostic banner.
     """
+    # Never reads request.user, so skip the user query authentication would run.
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     def post(self, request):
@@ -195,19 +350,45 @@ class ExchangeCodeView(APIView):
 
         try:
             with transaction.atomic():
-                exchange = DiagnosticExchangeCode.objects.select_for_update().get(
+                # Both users are needed for the response and token minting;
+                # fetch their exposed columns and token generations in the
+                # same query but lock only the code row.
+                exchange = DiagnosticExchangeCode.objects.select_for_update(of=('self',)).select_related(
+                    'customer_user', 'staff_user'
+                ).annotate(
+                    customer_generation=Coalesce('customer_user__token_generation__generation', 0),
+                    staff_generation=Coalesce('staff_user__token_generation__generation', 0),
+                ).only(
+                    'used',
+                    *(f'customer_user__{field}' for field in USER_FIELDS),
+                    *(f'staff_user__{field}' for field in USER_FIELDS),
+                ).get(
                     code=code,
                     used=False,
                     created_at__gte=cutoff,
+                    # Tokens are minted now, so both users must still qualify.
+                    customer_user__is_active=True,
+                    staff_user__is_active=True,
+                    staff_user__is_staff=True,
                 )
                 exchange.used = True
-                exchange.save()
+                exchange.redeemed_at = timezone.now()
+                exchange.save(update_fields=['used', 'redeemed_at'])
         except DiagnosticExchangeCode.DoesNotExist:
+            events.emit('code_rejected', request)
             return Response(
                 {'detail': 'Invalid or expired exchange code.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        customer_tokens = get_tokens_for_user(exchange.customer_user, exchange.customer_generation)
+        staff_access_token = get_access_token_for_user(exchange.staff_user, exchange.staff_generation)
+        events.emit(
+            'code_redeemed', request,
+            staff_user_id=exchange.staff_user_id,
+            customer_user_id=exchange.customer_user_id,
+        )
+
         response = Response({
             'customer': UserSerializer(exchange.customer_user).data,
             'staff': UserSerializer(exchange.staff_user).data,
@@ -217,9 +398,9 @@ class ExchangeCodeView(APIView):
         # when the browser tab is closed.
         set_diagnostic_cookies(
             response,
-            exchange.customer_access_token,
-            exchange.customer_refresh_token,
-            exchange.staff_access_token,
+            customer_tokens['access'],
+            customer_tokens['refresh'],
+            staff_access_token,
         )
         return response
 
@@ -235,20 +416,16 @@ class DiagnosticInfoView(APIView):
     Used by the customer frontend to restore the diagnostic banner after a
     page refresh within the same browser session.
     """
+    # Never reads request.user, so skip the user query authentication would run.
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     def get(self, request):
-        staff_token_str = request.COOKIES.get(settings.STAFF_ACCESS_TOKEN_COOKIE)
-        if not staff_token_str:
-            return Response(
-                {'detail': 'No active diagnostic session.'},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        auth = JWTAuthentication()
+        validated_token = _diagnostic_staff_token(request)
         try:
-            validated_token = auth.get_validated_token(staff_token_str)
-            staff_user = auth.get_user(validated_token)
+            if validated_token is None:
+                raise InvalidToken()
+            staff_user = JWTAuthentication().get_user(validated_token)
         except (TokenError, InvalidToken, Exception):
             return Response(
                 {'detail': 'No active diagnostic session.'},
@@ -259,3 +436,122 @@ class DiagnosticInfoView(APIView):
             'staff': UserSerializer(staff_user).data,
             'diagnostic': True,
         })
+
+
+class BulkTokenView(APIView):
+    """
+    Staff-only endpoint that mints token pairs for many users at once.
+
+    Intended for load-test fixtures and service-account provisioning.  Only
+    customers get tokens, as with ``DiagnosticLoginView``, unless the caller
+    is a superuser.  The response lists the minted pairs, the requested IDs
+    that were not found (or are inactive or excluded staff) and the signing
+    throughput.  Every call is recorded as a ``tokens_minted`` auth event.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        result = mint_tokens_bulk(
+            serializer.validated_data['user_ids'],
+            processes=settings.BULK_TOKEN_PROCESSES,
+            include_staff=request.user.is_superuser,
+        )
+        events.emit(
+            'tokens_minted', request,
+            by_user_id=request.user.pk,
+            user_ids=[pair['user_id'] for pair in result['tokens']],
+            missing=len(result['missing']),
+        )
+        return Response({
+            'tokens': result['tokens'],
+            'missing': result['missing'],
+            'count': result['count'],
+            'elapsed_ms': round(result['elapsed'] * 1000, 3),
+            'tokens_per_second': round(result['tokens_per_second'], 1),
+        })
+
+
+class IntrospectView(APIView):
+    """
+    Staff/service endpoint that validates a batch of customer access tokens.
+
+    Lets the API gateway and internal services check tokens without replaying
+    each one against ``/me/``.  Callers authenticate either with the usual
+    cookie or, for service accounts, with an ``Authorization: Bearer`` header.
+    Each token is validated exactly as ``CookieJWTAuthentication`` would and
+    reported as ``{active, user_id, exp, is_staff}``.
+    """
+    authentication_classes = [CookieJWTAuthentication, BearerJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = IntrospectSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = CookieJWTAuthentication().introspect(serializer.validated_data['tokens'])
+        return Response({'results': results})
+
+
+class DiagnosticSessionReportView(APIView):
+    """
+    Per-staff diagnostic-session analytics. Staff only.
+
+    Returns sessions started, redeemed, expired unused and pending, plus the
+    average seconds to redeem, for each staff member and in total.
+    ``?since=`` / ``?until=`` (ISO datetimes) bound the code creation time
+    and ``?staff_user=<id>`` selects one staff member.  With ``?detail=true``
+    the individual sessions are streamed as NDJSON instead.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = DiagnosticSessionReportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = {
+            'since': serializer.validated_data.get('since'),
+            'until': serializer.validated_data.get('until'),
+            'staff_user_id': serializer.validated_data.get('staff_user'),
+        }
+
+        if serializer.validated_data['detail']:
+            lines = (json.dumps(row) + '\n' for row in session_rows(**filters))
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        return Response(session_stats(**filters))
+
+
+class ProfileReportListView(APIView):
+    """
+    List stored request profiles, newest first. Staff only.
+
+    ``?view=<ViewName>`` restricts the list to one view class.  Profiles are
+    recorded by ``ProfilingMiddleware``.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_reports(view=request.query_params.get('view')))
+
+
+class ProfileReportView(APIView):
+    """
+    Download one stored profile. Staff only.
+
+    Returns the raw ``pstats`` dump, or with ``?output=text`` the top
+    functions by cumulative time as plain text.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        path = report_path(name)
+        if path is None:
+            return Response(
+                {'detail': 'Profile not found.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if request.query_params.get('output') == 'text':
+            return HttpResponse(render_report(path), content_type='text/plain; charset=utf-8')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
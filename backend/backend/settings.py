@@ -4,6 +4,9 @@ Django settings for backend project.
 
 from pathlib import Path
 import os
+import tempfile
+
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -34,6 +37,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'authentication.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -81,6 +85,18 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed JSON (falls back to the stdlib encoder when orjson is
+    # not installed); swap in rest_framework's JSONRenderer/JSONParser to
+    # use the stock classes.
+    'DEFAULT_RENDERER_CLASSES': (
+        'authentication.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'authentication.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # Simple JWT settings
@@ -114,6 +130,80 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:3002',
 ]
 CORS_ALLOW_CREDENTIALS = True
+# Let the intranet send the profiling trigger header (see PROFILING_* below)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-profile')
 
 # Exchange code expiry (seconds)
 DIAGNOSTIC_CODE_EXPIRY = 60  # 1 minute
+
+# Bulk token minting (``tokens/bulk/`` endpoint and ``mint_tokens`` command)
+BULK_TOKEN_MAX_USERS = 10000  # per request to the endpoint
+BULK_TOKEN_PROCESSES = 0  # 0 = sign in the request thread
+
+# Maximum number of tokens accepted per ``introspect/`` request
+INTROSPECT_MAX_TOKENS = 1000
+
+# Per-user token generation ("log out everywhere"). Every token carries the
+# user's generation in this claim; bumping it revokes all of them. The value
+# is cached, so with several workers CACHES must point at a shared backend
+# (e.g. Redis) for a revocation to take effect everywhere immediately;
+# otherwise it takes effect within the cache timeout. Tokens are always
+# minted at the generation in the database, and a token newer than the
+# cached value re-reads it, so logging in again after a revocation works
+# on every worker either way.
+TOKEN_GENERATION_CLAIM = 'gen'
+TOKEN_GENERATION_CACHE_TIMEOUT = 300  # seconds
+
+# Sign and verify HS256 tokens with the pre-computed codec in
+# ``authentication.codec`` instead of PyJWT's generic path. Tokens are
+# byte-identical either way, so this can be toggled without logging users out.
+# FastCodecTests runs malformed, expired, wrong-algorithm and tampered tokens
+# through both codecs and requires identical outcomes.
+JWT_FAST_CODEC = os.environ.get('JWT_FAST_CODEC', 'True') == 'True'
+
+# Issue compact tokens (``authentication.tokens``): one-letter claim names,
+# integer token types, a short jti and no generation claim while it is 0.
+# Tokens of both profiles are accepted either way, so this can be toggled
+# without logging users out; the configured profile is tried first.
+JWT_COMPACT_TOKENS = os.environ.get('JWT_COMPACT_TOKENS', 'False') == 'True'
+if JWT_COMPACT_TOKENS:
+    SIMPLE_JWT['AUTH_TOKEN_CLASSES'] = (
+        'authentication.tokens.CompactAccessToken',
+        'rest_framework_simplejwt.tokens.AccessToken',
+    )
+else:
+    SIMPLE_JWT['AUTH_TOKEN_CLASSES'] = (
+        'rest_framework_simplejwt.tokens.AccessToken',
+        'authentication.tokens.CompactAccessToken',
+    )
+
+# Customer search (``users/search/``)
+USER_SEARCH_MAX_LIMIT = 100
+# Name/email prefix matches ranked per field; bounds the work of short prefixes.
+USER_SEARCH_MAX_CANDIDATES = 200
+# Substring matching after the prefix ranks. Index-backed only on PostgreSQL
+# (pg_trgm, migration 0007); elsewhere it scans the table, so keep it off.
+USER_SEARCH_SUBSTRING = os.environ.get('USER_SEARCH_SUBSTRING', 'False') == 'True'
+USER_SEARCH_SUBSTRING_MIN_LENGTH = 3  # shorter queries match prefixes only
+# Serve prefix matches from an in-process sorted index (built in the
+# background, kept current by User signals, fully rebuilt after
+# USER_SEARCH_INDEX_MAX_AGE seconds) instead of the database. Costs memory
+# proportional to the number of customers.
+USER_SEARCH_INDEX = os.environ.get('USER_SEARCH_INDEX', 'False') == 'True'
+USER_SEARCH_INDEX_MAX_AGE = 300
+
+# Per-request profiling (``ProfilingMiddleware``). When enabled, profiles
+# PROFILING_SAMPLE_RATE of all requests plus any staff request carrying the
+# trigger header, keeping the newest PROFILING_MAX_REPORTS reports on disk.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TRIGGER_HEADER = 'X-Profile'
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'auth-profiles'))
+PROFILING_MAX_REPORTS = 100
+
+# Structured auth-event log (``authentication.events``): one JSON object per
+# line for logins, refreshes, code redemptions and revocations, written by a
+# background thread. A file path, '-' for stderr, or empty to disable. Events
+# beyond AUTH_EVENT_QUEUE_SIZE waiting to be written are dropped and counted.
+AUTH_EVENT_LOG = os.environ.get('AUTH_EVENT_LOG', '')
+AUTH_EVENT_QUEUE_SIZE = 10000
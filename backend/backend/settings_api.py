@@ -0,0 +1,39 @@
+"""
+Lean "api" settings profile for auth workers.
+
+Select it with ``DJANGO_SETTINGS_MODULE=backend.settings_api``.  Every request
+here is authenticated by ``CookieJWTAuthentication``, so server-side sessions,
+the messages framework, Django's ``AuthenticationMiddleware``, the admin and
+the browsable API are dead weight on each request and at worker startup.
+CSRF protection for the cookie-authenticated POSTs is kept by
+``TrustedOriginMiddleware``.
+
+Compare both profiles with ``python manage.py benchmark profile``.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'corsheaders',
+    'authentication',
+]
+
+MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'authentication.middleware.TrustedOriginMiddleware',
+    'authentication.middleware.ProfilingMiddleware',
+]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'authentication.renderers.FastJSONRenderer',
+    ),
+}
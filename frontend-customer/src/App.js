@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import Login from './components/Login';
 import Dashboard from './components/Dashboard';
-import { getMe, refreshToken, exchangeDiagnosticCode, getDiagnosticInfo } from './api';
+import { bootstrap, refreshToken, exchangeDiagnosticCode } from './api';
 
 export default function App() {
   const [user, setUser] = useState(null);
@@ -47,29 +47,24 @@ export default function App() {
         return;
       }
 
-      // Normal session restore flow
-      let me = await getMe();
-      if (!me) {
+      // Normal session restore flow.  One request returns the user and,
+      // for a diagnostic session (staff_access_token session cookie present
+      // and valid), the staff member, which restores the diagnostic banner
+      // after a page refresh within the same browser session.
+      let session = await bootstrap();
+      if (!session) {
         const refreshed = await refreshToken();
         if (refreshed) {
-          me = await getMe();
+          session = await bootstrap();
         }
       }
       // Customer portal: reject staff users silently (force re-login)
-      if (me && me.is_staff) {
-        me = null;
+      if (session && session.user.is_staff) {
+        session = null;
       }
-      setUser(me);
-
-      // If a customer session is active, check whether it is a diagnostic
-      // session (staff_access_token session cookie present and valid).
-      // This restores the diagnostic banner after a page refresh within the
-      // same browser session.
-      if (me) {
-        const diagInfo = await getDiagnosticInfo();
-        if (diagInfo) {
-          setStaff(diagInfo.staff);
-        }
+      setUser(session ? session.user : null);
+      if (session && session.staff) {
+        setStaff(session.staff);
       }
 
       setLoading(false);
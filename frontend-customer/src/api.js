@@ -45,6 +45,19 @@ export async function getMe() {
   return data;
 }
 
+/**
+ * Restore the session in one request.
+ * Returns { user, staff, diagnostic, access_expires_in } or null when
+ * not logged in.
+ */
+export async function bootstrap() {
+  const res = await request('GET', '/bootstrap/');
+  if (res.status === 401) return null;
+  const data = await res.json();
+  if (!res.ok) throw new Error(data.detail || 'Failed to restore session');
+  return data;
+}
+
 export async function refreshToken() {
   const res = await request('POST', '/refresh/');
   return res.ok;
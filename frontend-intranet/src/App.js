@@ -1,24 +1,27 @@
 import React, { useState, useEffect } from 'react';
 import Login from './components/Login';
 import Dashboard from './components/Dashboard';
-import { getMe, refreshToken } from './api';
+import { bootstrap, refreshToken } from './api';
 
 export default function App() {
   const [user, setUser] = useState(null);
+  const [initialCustomers, setInitialCustomers] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    // Try to restore session on page load
+    // Try to restore session on page load.  One request returns the user
+    // and the customer list instead of /me/ followed by /users/.
     async function restoreSession() {
-      let me = await getMe();
-      if (!me) {
+      let session = await bootstrap({ customers: true });
+      if (!session) {
         // Try refresh once
         const refreshed = await refreshToken();
         if (refreshed) {
-          me = await getMe();
+          session = await bootstrap({ customers: true });
         }
       }
-      setUser(me);
+      setUser(session ? session.user : null);
+      setInitialCustomers(session ? session.customers || null : null);
       setLoading(false);
     }
     restoreSession();
@@ -36,5 +39,11 @@ export default function App() {
     return <Login onLogin={setUser} />;
   }
 
-  return <Dashboard user={user} onLogout={() => setUser(null)} />;
+  return (
+    <Dashboard
+      user={user}
+      initialCustomers={initialCustomers}
+      onLogout={() => { setUser(null); setInitialCustomers(null); }}
+    />
+  );
 }
@@ -41,6 +41,19 @@ export async function getMe() {
   return data;
 }
 
+/**
+ * Restore the session in one request.
+ * Returns { user, staff, diagnostic, access_expires_in, customers? } or
+ * null when not logged in.  Staff can ask for the customer list too.
+ */
+export async function bootstrap({ customers = false } = {}) {
+  const res = await request('GET', customers ? '/bootstrap/?customers=true' : '/bootstrap/');
+  if (res.status === 401) return null;
+  const data = await res.json();
+  if (!res.ok) throw new Error(data.detail || 'Failed to restore session');
+  return data;
+}
+
 export async function refreshToken() {
   const res = await request('POST', '/refresh/');
   return res.ok;
@@ -53,6 +66,14 @@ export async function getCustomers() {
   return data;
 }
 
+export async function searchCustomers(query, limit = 20) {
+  const params = new URLSearchParams({ q: query, limit });
+  const res = await request('GET', `/users/search/?${params}`);
+  const data = await res.json();
+  if (!res.ok) throw new Error(data.detail || 'Failed to search customers');
+  return data;
+}
+
 export async function diagnosticLogin(customerId) {
   const res = await request('POST', '/diagnostic-login/', { customer_id: customerId });
   const data = await res.json();
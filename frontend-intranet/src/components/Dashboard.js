@@ -1,5 +1,5 @@
-import React, { useEffect, useState, useCallback } from 'react';
-import { getCustomers, diagnosticLogin, logout } from '../api';
+import React, { useEffect, useState, useCallback, useRef } from 'react';
+import { getCustomers, searchCustomers, diagnosticLogin, logout } from '../api';
 
 // URL of the customer frontend — configurable via environment variable
 const CUSTOMER_FRONTEND_URL = process.env.REACT_APP_CUSTOMER_FRONTEND_URL || 'http://localhost:3002';
@@ -64,30 +64,56 @@ const styles = {
     boxShadow: '0 4px 16px rgba(0,0,0,0.18)',
     zIndex: 1000,
   },
+  search: {
+    width: '100%',
+    boxSizing: 'border-box',
+    padding: '10px 14px',
+    marginBottom: 16,
+    border: '1px solid #c5cae9',
+    borderRadius: 8,
+    fontSize: 14,
+  },
   error: { background: '#fdecea', color: '#c62828', borderRadius: 8, padding: '10px 14px', marginBottom: 16 },
 };
 
-export default function Dashboard({ user, onLogout }) {
-  const [customers, setCustomers] = useState([]);
-  const [loading, setLoading] = useState(true);
+export default function Dashboard({ user, initialCustomers = null, onLogout }) {
+  const [customers, setCustomers] = useState(initialCustomers || []);
+  const [loading, setLoading] = useState(!initialCustomers);
   const [error, setError] = useState('');
   const [toast, setToast] = useState('');
   const [diagLoading, setDiagLoading] = useState(null);
+  const [query, setQuery] = useState('');
+  // The session bootstrap already returned the unfiltered list
+  const skipInitialFetch = useRef(Boolean(initialCustomers));
+  // Only the most recent request may update the table; a slow response to an
+  // earlier query must not overwrite the results of a later one.
+  const latestRequest = useRef(0);
 
-  const fetchCustomers = useCallback(async () => {
+  const fetchCustomers = useCallback(async (q) => {
+    const requestId = ++latestRequest.current;
     try {
-      const data = await getCustomers();
+      // Search server-side instead of downloading and filtering every customer
+      const data = q ? await searchCustomers(q) : await getCustomers();
+      if (requestId !== latestRequest.current) return;
       setCustomers(data);
+      setError('');
     } catch (err) {
+      if (requestId !== latestRequest.current) return;
       setError(err.message);
     } finally {
-      setLoading(false);
+      if (requestId === latestRequest.current) setLoading(false);
     }
   }, []);
 
   useEffect(() => {
-    fetchCustomers();
-  }, [fetchCustomers]);
+    if (skipInitialFetch.current) {
+      skipInitialFetch.current = false;
+      return undefined;
+    }
+    // Debounce typeahead so each keystroke doesn't fire a request
+    const timer = setTimeout(() => fetchCustomers(query.trim()), query ? 200 : 0);
+    return () => clearTimeout(timer);
+  }, [fetchCustomers, query]);
 
   const handleLogout = async () => {
     try {
@@ -147,6 +173,14 @@ export default function Dashboard({ user, onLogout }) {
 
         {error && <div style={styles.error}>{error}</div>}
 
+        <input
+          style={styles.search}
+          type="search"
+          placeholder="Search by username, name or email…"
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+        />
+
         {loading ? (
           <p>Loading customers…</p>
         ) : (